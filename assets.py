@@ -0,0 +1,282 @@
+# assets.py — images, sounds and fonts, loaded on first use
+#
+# Nothing is decoded at import time: each asset is loaded (and cached) the
+# first time the game asks for it, so the menu only pays for the menu
+# background and two fonts, and a level background is only read once that
+# level is reached.
+#
+# For an even faster cold start, bake an asset pack once:
+#
+#     python assets.py build
+#
+# assets.pack holds every image already scaled, as raw pixels, plus decoded
+# sounds and resolved font paths. It is memory-mapped at startup and surfaces
+# are made straight from the mapped bytes: no JPG/PNG/WAV decoding, no
+# scaling and no system font enumeration. Each image and sound entry records
+# its source file's size and mtime; an entry whose file has changed since the
+# build is ignored and that asset loads from the file, so rebuild after
+# changing a file to get the fast path back.
+
+import json, mmap, os, struct, sys
+import pygame
+from engine import WIDTH, HEIGHT
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PACK_FILE = os.path.join(BASE_DIR, "assets.pack")
+PACK_MAGIC = b"SNKPACK2"
+
+# ---------------- CATALOG (filenames from your folder) ----------------
+SCREEN_SIZE = (WIDTH, HEIGHT)
+
+# name -> (file, size to scale to or None to keep)
+IMAGES = {
+    "background1": ("background_forest.jpg", SCREEN_SIZE),
+    "background2": ("background_desert.jpg", SCREEN_SIZE),
+    "background3": ("background_space.jpg", SCREEN_SIZE),
+    "menu_background": ("menu_background.jpg", SCREEN_SIZE),
+    # fruit / powerup names match the item kinds in engine.py
+    "apple": ("apple.png", None),
+    "banana": ("banana.png", None),
+    "berry": ("berry.png", None),
+    "golden": ("golden_apple.png", None),
+    "rock": ("rock.png", (30,30)),
+    "shield": ("shield.png", (25,25)),
+    "slow": ("slow.png", (25,25)),
+}
+OPAQUE = {"background1", "background2", "background3", "menu_background"}
+
+SOUNDS = {
+    "chomp": "chomp.wav",
+    "crash": "crash.wav",
+    "levelup": "levelup.wav",
+}
+
+# name -> (system font name, size, bold)
+FONTS = {
+    "title": ("comicsansms", 60, True),
+    "big": ("comicsansms", 50, True),
+    "score": ("comicsansms", 28, False),
+    "ui": ("bahnschrift", 22, False),
+    "mono": ("consolas,dejavusansmono,couriernew,monospace", 16, False),   # profiler overlay
+}
+
+# ---------------- SAFE LOADERS ----------------
+def safe_load_image(name, fallback_size=(40,40), col=(120,120,120)):
+    path = os.path.join(BASE_DIR, name)
+    try:
+        img = pygame.image.load(path)
+        return img.convert_alpha() if pygame.display.get_surface() else img
+    except Exception:
+        surf = pygame.Surface(fallback_size, pygame.SRCALPHA)
+        surf.fill(col)
+        return surf
+
+class _NoSound:
+    def play(self, *a, **k): pass
+
+def safe_load_sound(name):
+    path = os.path.join(BASE_DIR, name)
+    try:
+        return pygame.mixer.Sound(path)
+    except Exception:
+        return _NoSound()
+
+def source_stamp(name):
+    # [size, mtime] of an asset file, None if it is missing
+    try:
+        st = os.stat(os.path.join(BASE_DIR, name))
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def resolve_font(name, bold):
+    # (file path or None, fake bold) — what SysFont would pick, without building a Font
+    path = pygame.font.match_font(name, bold=bold)
+    fake_bold = bold and (path is None or path == pygame.font.match_font(name))
+    return path, fake_bold
+
+# ---------------- PACK ----------------
+class AssetPack:
+    # read side of assets.pack: header, JSON manifest, then raw buffers.
+    # image() and sound() give None for an entry whose source file changed since the build.
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.mm[:8] != PACK_MAGIC:
+                raise ValueError("not an asset pack: %s" % path)
+            (n,) = struct.unpack_from("<I", self.mm, 8)
+            self.manifest = json.loads(bytes(self.mm[12:12+n]))
+            self.base = 12 + n
+        except Exception:
+            self.file.close()
+            raise
+        self.view = memoryview(self.mm)
+
+    def image(self, name):
+        entry = self.manifest["images"].get(name)
+        if entry is None:
+            return None
+        offset, length, w, h, fmt, stamp = entry
+        if stamp != source_stamp(IMAGES[name][0]):
+            return None
+        offset += self.base
+        # frombuffer keeps pointing into the mapping: no copy, no decode
+        return pygame.image.frombuffer(self.view[offset:offset+length], (w, h), fmt)
+
+    def sound(self, name):
+        entry = self.manifest["sounds"].get(name)
+        if entry is None or tuple(entry[2]) != pygame.mixer.get_init():
+            return None
+        if entry[3] != source_stamp(SOUNDS[name]):
+            return None
+        offset, length = entry[0] + self.base, entry[1]
+        return pygame.mixer.Sound(buffer=self.view[offset:offset+length])
+
+    def font(self, name, bold):
+        entry = self.manifest["fonts"].get("%s|%d" % (name, bold))
+        return tuple(entry) if entry is not None else None
+
+def build_pack(path=PACK_FILE):
+    pygame.init()
+    try:
+        pygame.mixer.init()
+    except Exception:
+        pass
+    blobs = []
+    manifest = {"images": {}, "sounds": {}, "fonts": {}}
+    offset = 0
+
+    def add(data):
+        nonlocal offset
+        start = offset
+        blobs.append(data)
+        offset += len(data)
+        pad = -offset % 16
+        if pad:
+            blobs.append(b"\0" * pad)
+            offset += pad
+        return start
+
+    # missing files are left out rather than baking the placeholder, which
+    # would keep being served after the file is added
+    for name, (filename, size) in IMAGES.items():
+        stamp = source_stamp(filename)
+        if stamp is None:
+            continue
+        img = safe_load_image(filename)
+        if size is not None:
+            img = pygame.transform.scale(img, size)
+        fmt = "RGBX" if name in OPAQUE else "RGBA"
+        data = pygame.image.tobytes(img, fmt)
+        manifest["images"][name] = [add(data), len(data), img.get_width(), img.get_height(), fmt, stamp]
+
+    mixer_format = pygame.mixer.get_init()
+    if mixer_format:
+        for name, filename in SOUNDS.items():
+            stamp = source_stamp(filename)
+            snd = safe_load_sound(filename)
+            if stamp is None or isinstance(snd, _NoSound):
+                continue
+            data = snd.get_raw()
+            manifest["sounds"][name] = [add(data), len(data), list(mixer_format), stamp]
+
+    for font_name, size, bold in FONTS.values():
+        manifest["fonts"]["%s|%d" % (font_name, bold)] = list(resolve_font(font_name, bold))
+
+    # offsets are relative to the data block, which starts 16-aligned after the header
+    header = json.dumps(manifest).encode()
+    header += b" " * (-(12 + len(header)) % 16)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(PACK_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for b in blobs:
+            f.write(b)
+    os.replace(tmp, path)
+    return path
+
+# ---------------- LAZY ASSETS ----------------
+class Assets:
+    def __init__(self, pack_path=PACK_FILE):
+        self.images = {}
+        self.sounds = {}
+        self.fonts = {}
+        self.pack = None
+        if pack_path and os.path.exists(pack_path):
+            try:
+                self.pack = AssetPack(pack_path)
+            except Exception:
+                self.pack = None    # broken pack or an older format: fall back to the files
+
+    def image(self, name):
+        img = self.images.get(name)
+        if img is None:
+            img = self.pack.image(name) if self.pack else None
+            if img is not None and pygame.display.get_surface():
+                # match the display format once so every later blit is a plain copy
+                img = img.convert() if name in OPAQUE else img.convert_alpha()
+            if img is None:
+                filename, size = IMAGES[name]
+                img = safe_load_image(filename)
+                if size is not None:
+                    img = pygame.transform.scale(img, size)
+            self.images[name] = img
+        return img
+
+    def background(self, level):
+        name = "background%d" % level
+        return self.image(name if name in IMAGES else "background1")
+
+    def sound(self, name):
+        snd = self.sounds.get(name)
+        if snd is None:
+            if self.pack and pygame.mixer.get_init():
+                snd = self.pack.sound(name)
+            if snd is None:
+                snd = safe_load_sound(SOUNDS[name])
+            self.sounds[name] = snd
+        return snd
+
+    def font(self, name):
+        font = self.fonts.get(name)
+        if font is None:
+            sys_name, size, bold = FONTS[name]
+            resolved = self.pack.font(sys_name, bold) if self.pack else None
+            if resolved is None:
+                font = pygame.font.SysFont(sys_name, size, bold=bold)
+            else:
+                path, fake_bold = resolved
+                font = pygame.font.Font(path, size)
+                font.set_bold(fake_bold)
+            self.fonts[name] = font
+        return font
+
+class LazyFont:
+    # stands in for a pygame Font until something is rendered with it
+    def __init__(self, assets, name):
+        self.assets = assets
+        self.name = name
+
+    def render(self, *args):
+        return self.assets.font(self.name).render(*args)
+
+    def size(self, text):
+        return self.assets.font(self.name).size(text)
+
+class LazySound:
+    # stands in for a pygame Sound; decoded on the first play()
+    def __init__(self, assets, name):
+        self.assets = assets
+        self.name = name
+
+    def play(self, *args, **kwargs):
+        return self.assets.sound(self.name).play(*args, **kwargs)
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build"]:
+        sys.exit("usage: python assets.py build")
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    print("wrote", build_pack())
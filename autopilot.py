@@ -0,0 +1,347 @@
+# autopilot.py — a bot that plays SnakeEngine, for the demo/attract mode and soak tests
+#
+# Each tick the bot heads for the current item along a shortest path (A*) that
+# only uses cells that will be free by the time the head gets there: the body
+# keeps sliding away from the tail, so a cell it covers now can be fine a few
+# moves ahead. A path is only taken if the head can still get back to its tail
+# once the item is eaten; otherwise the bot stalls by chasing its own tail
+# until a safe path opens up.
+#
+# Planned paths are cached. The engine moves the body exactly as the plan
+# assumed, so a path stays valid until the item changes or rocks appear; each
+# tick just takes the next step (O(1)), and new rocks only cost a small local
+# detour around the blocked cells instead of a new search.
+#
+#     python autopilot.py -n 20        # headless soak test, one line per game
+
+import argparse, heapq, sys, time
+from collections import deque
+import engine
+from engine import DIRECTIONS, NOOP
+
+PLAN_BUDGET_PER_CELL = 16   # a search may expand this many cells per board cell before giving up...
+MAX_PLAN_BUDGET = 50000     # ...but never more than this, so a tick on a huge world stays short
+TABLE_CELLS = 1 << 16       # boards up to this size get a precomputed neighbour table
+REPAIR_BUDGET = 400     # cells a local detour may expand before falling back to a new plan
+REPAIR_SPAN = 8         # how far past a blocked cell a detour may rejoin the path
+STALL_RETRY = 3         # ticks between attempts at the item while chasing the tail
+
+class Neighbors:
+    # cell -> ((cell, action), ...) for each move that stays on a w x h board,
+    # worked out on demand (see neighbors() for small boards)
+    def __init__(self, w, h):
+        self.w, self.h = w, h
+
+    def __getitem__(self, c):
+        w, h = self.w, self.h
+        x, y = c % w, c // w
+        return tuple((x+dx + (y+dy)*w, a) for a, (dx, dy) in DIRECTIONS.items()
+                     if 0 <= x+dx < w and 0 <= y+dy < h)
+
+_tables = {}
+
+def neighbors(w, h):
+    # neighbour lookup for a w x h board: a table built once per size, or Neighbors for big ones
+    table = _tables.get((w, h))
+    if table is None:
+        table = Neighbors(w, h)
+        if w * h <= TABLE_CELLS:
+            table = _tables[w, h] = [table[c] for c in range(w * h)]
+    return table
+
+class Autopilot:
+    # pilot.action(game) before every game.step(); one bot can play any number of games
+
+    def __init__(self, plan_budget=None, repair_budget=REPAIR_BUDGET):
+        self.fixed_budget = plan_budget    # None: scaled to each game's board
+        self.plan_budget = plan_budget
+        self.repair_budget = repair_budget
+        self.w = self.h = None
+        self.neighbors = None
+        self.sparse = False
+        # seq[c]: number of the newest body segment in cell c (head is head_seq),
+        # so a segment's distance from the tail, i.e. when it moves off, is O(1)
+        self.seq = None
+        self.head_seq = 0
+        self.game = self.seed = None
+        self.ticks = -1
+        self.path = deque()     # cells still to walk, next one first
+        self.target = None
+        self.rock_version = None
+        self.retry_at = 0
+        self.plans = self.repairs = 0
+
+    # ---------------- STATE ----------------
+    def sync(self, game):
+        # follow the body one tick at a time; a new game or a skipped tick rebuilds it
+        same = game is self.game and game.seed == self.seed
+        if same and game.ticks == self.ticks:
+            return
+        if same and game.ticks == self.ticks + 1:
+            if game.moved:
+                w = self.w
+                self.head_seq += 1
+                self.seq[game.x + game.y*w] = self.head_seq
+                if self.sparse and game.last_tail is not None:
+                    tx, ty = game.last_tail
+                    if not game.occupied[tx + ty*w]:
+                        self.seq.pop(tx + ty*w, None)
+        else:
+            self.board(game)
+            seq, w = self.seq, self.w
+            for i, (x, y) in enumerate(game.snake):
+                seq[x + y*w] = i
+            self.head_seq = len(game.snake) - 1
+            self.path.clear()
+            self.target = None
+            self.retry_at = 0
+        self.game, self.seed, self.ticks = game, game.seed, game.ticks
+
+    def board(self, game):
+        # size everything for game's board; big boards get a sparse seq
+        w, h = game.grid_w, game.grid_h
+        self.sparse = w * h > TABLE_CELLS
+        if (w, h) != (self.w, self.h):
+            self.w, self.h = w, h
+            self.neighbors = neighbors(w, h)
+            self.seq = None
+            if self.fixed_budget is None:
+                self.plan_budget = min(MAX_PLAN_BUDGET, PLAN_BUDGET_PER_CELL * w * h)
+        if self.sparse:
+            self.seq = {}
+        elif self.seq is None:
+            self.seq = [0] * (w * h)
+
+    def base(self, game):
+        # a body cell c is free from move seq[c] + base on (1 = the next move)
+        tail_seq = self.head_seq - len(game.snake) + 1
+        return game.length - len(game.snake) + 1 - tail_seq
+
+    def reverse(self, game):
+        # the cell behind the head: the engine ignores 180-degree turns
+        if not (game.dx or game.dy):
+            return None
+        x, y = game.x - game.dx, game.y - game.dy
+        return x + y*self.w if 0 <= x < self.w and 0 <= y < self.h else None
+
+    # ---------------- DECISION ----------------
+    def action(self, game):
+        if game.done:
+            return NOOP
+        self.sync(game)
+        w, adj = self.w, self.neighbors
+        head = game.x + game.y*w
+        item = game.item
+        target = None if item is None else item[1] + item[2]*w
+        path = self.path
+        if path and (target != self.target or path[0] not in self.adjacent(head)):
+            path.clear()
+        if path and game.rock_version != self.rock_version:
+            self.repair(game, head)
+        if not path and target is not None and game.ticks >= self.retry_at:
+            self.plan(game, head, target)
+        if path:
+            nxt = path.popleft()
+            for n, a in adj[head]:
+                if n == nxt:
+                    return a
+        return self.stall(game, head)
+
+    def adjacent(self, c):
+        return [n for n, _ in self.neighbors[c]]
+
+    def plan(self, game, head, target):
+        self.plans += 1
+        path = self.astar(game, head, target)
+        if path is not None and self.safe_after(game, path):
+            self.path.extend(path)
+            self.target = target
+            self.rock_version = game.rock_version
+        else:
+            self.retry_at = game.ticks + STALL_RETRY
+
+    def astar(self, game, head, goal):
+        # shortest path head -> goal (excluding head) through cells that are free on arrival
+        rocks, occupied, seq = game.rocks, game.occupied, self.seq
+        w, adj = self.w, self.neighbors
+        base = self.base(game)
+        rev = self.reverse(game)
+        gx, gy = goal % w, goal // w
+        came = {head: None}
+        heap = [(0, 0, head)]
+        budget = self.plan_budget
+        while heap:
+            _, k, c = heapq.heappop(heap)
+            if c == goal:
+                path = []
+                while c != head:
+                    path.append(c)
+                    c = came[c]
+                path.reverse()
+                return path
+            budget -= 1
+            if budget < 0:
+                return None
+            k += 1
+            for n, _ in adj[c]:
+                if n in came or rocks[n] or (occupied[n] and seq[n] + base > k) or (k == 1 and n == rev):
+                    continue
+                came[n] = c
+                heapq.heappush(heap, (k + abs(n % w - gx) + abs(n // w - gy), k, n))
+        return None
+
+    def safe_after(self, game, path):
+        # once path is walked and the item eaten, can the head still reach the tail?
+        w, adj = self.w, self.neighbors
+        body = [x + y*w for x, y in game.snake]
+        body.extend(path)
+        del body[:-game.length]
+        grow = game.length + (game.item[0] not in engine.POWERUPS) - len(body)
+        if len(body) + grow <= 2:
+            return True
+        leaves = {c: i + 1 + grow for i, c in enumerate(body)}   # newest segment wins
+        rocks, tail, head = game.rocks, body[0], body[-1]
+        seen = {head}
+        frontier = [head]
+        k = 0
+        budget = self.plan_budget
+        while frontier and budget > 0:
+            k += 1
+            nxt = []
+            for c in frontier:
+                for n, _ in adj[c]:
+                    if n in seen or rocks[n] or leaves.get(n, 0) > k:
+                        continue
+                    if n == tail:
+                        return True
+                    seen.add(n)
+                    nxt.append(n)
+            budget -= len(nxt)
+            frontier = nxt
+        return False
+
+    def repair(self, game, head):
+        # rocks changed under the cached path: detour from just before the first
+        # blocked cell to a cell a little past it, or give up and plan again
+        self.rock_version = game.rock_version
+        path, rocks, adj = self.path, game.rocks, self.neighbors
+        bad = next((i for i, c in enumerate(path) if rocks[c]), None)
+        if bad is None:
+            return
+        self.repairs += 1
+        cells = list(path)
+        # rejoin no sooner than the old path would have: later cells only get freer
+        goals = {cells[j]: j for j in range(bad + 1, min(len(cells), bad + 1 + REPAIR_SPAN))
+                 if not rocks[cells[j]]}
+        avoid = set(cells)
+        occupied, seq, base = game.occupied, self.seq, self.base(game)
+        start = cells[bad-1] if bad else head
+        rev = self.reverse(game) if not bad else None
+        came = {start: None}
+        frontier = [start]
+        k = bad
+        budget = self.repair_budget
+        while frontier and budget > 0:
+            k += 1
+            nxt = []
+            for c in frontier:
+                for n, _ in adj[c]:
+                    if n in came or rocks[n] or (occupied[n] and seq[n] + base > k) or n == rev:
+                        continue
+                    j = goals.get(n)
+                    if j is not None and k >= j + 1:
+                        detour = [n]
+                        while c != start:
+                            detour.append(c)
+                            c = came[c]
+                        detour.reverse()
+                        new = cells[:bad] + detour + cells[j+1:]
+                        path.clear()
+                        if self.safe_after(game, new):
+                            path.extend(new)
+                        return
+                    if n in avoid:
+                        continue
+                    came[n] = c
+                    nxt.append(n)
+            budget -= len(nxt)
+            frontier = nxt
+        path.clear()
+
+    def stall(self, game, head):
+        # no safe path to the item: keep the tail within reach, taking the move
+        # farthest from it so the body has time to clear the way
+        rocks, occupied, seq = game.rocks, game.occupied, self.seq
+        w, adj = self.w, self.neighbors
+        base = self.base(game)
+        rev = self.reverse(game)
+        moves = [(n, a) for n, a in adj[head]
+                 if n != rev and not rocks[n] and not (occupied[n] and seq[n] + base > 1)]
+        if not moves:
+            return NOOP
+        tx, ty = game.snake[0]
+        tail = tx + ty*w
+        dist = {tail: 0}
+        frontier = [tail]
+        d = 0
+        budget = self.plan_budget
+        left = sum(n != tail for n, _ in moves)    # stop once every move has its distance
+        while frontier and budget > 0 and left:
+            d += 1
+            nxt = []
+            for c in frontier:
+                for n, _ in adj[c]:
+                    if n not in dist and not rocks[n] and not occupied[n]:
+                        dist[n] = d
+                        nxt.append(n)
+                        left -= any(n == m for m, _ in moves)
+            budget -= len(nxt)
+            frontier = nxt
+        reachable = [(dist[n], a) for n, a in moves if n in dist]
+        if reachable:
+            return max(reachable)[1]
+        # cut off from the tail: go where there is the most room
+        return max((self.room(game, n, len(game.snake)), a) for n, a in moves)[1]
+
+    def room(self, game, start, cap):
+        # free cells reachable from start, counting up to cap
+        rocks, occupied, adj = game.rocks, game.occupied, self.neighbors
+        seen = {start}
+        frontier = [start]
+        while frontier and len(seen) < cap:
+            nxt = []
+            for c in frontier:
+                for n, _ in adj[c]:
+                    if n not in seen and not rocks[n] and not occupied[n]:
+                        seen.add(n)
+                        nxt.append(n)
+            frontier = nxt
+        return len(seen)
+
+# ---------------- SOAK TEST ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Let the autopilot play headless games")
+    parser.add_argument("-n", "--games", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first game (then +1 per game)")
+    parser.add_argument("--max-ticks", type=int, default=20000, help="stop a game that runs this long")
+    args = parser.parse_args(argv)
+
+    pilot = Autopilot()
+    game = engine.SnakeEngine(args.seed)
+    print("%6s %6s %6s %7s %8s %9s %9s" % ("seed", "score", "level", "length", "ticks", "mean ms", "max ms"))
+    for seed in range(args.seed, args.seed + args.games):
+        game.reset(seed)
+        total = worst = 0.0
+        while not game.done and game.ticks < args.max_ticks:
+            t = time.perf_counter()
+            action = pilot.action(game)
+            t = time.perf_counter() - t
+            total += t
+            worst = max(worst, t)
+            game.step(action)
+        print("%6d %6d %6d %7d %8d %9.3f %9.3f" % (seed, game.score, game.level, len(game.snake), game.ticks,
+                                                   total * 1000 / max(1, game.ticks), worst * 1000))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
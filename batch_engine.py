@@ -0,0 +1,383 @@
+# batch_engine.py — thousands of Snake games stepped at once with NumPy
+#
+# Same rules as engine.SnakeEngine, but every piece of state is an array with
+# one row (or element) per game, and step() takes one action per game and
+# advances the whole batch with vectorized operations. Meant for tuning the
+# fruit / obstacle parameters, where one game per Python loop is far too slow:
+#
+#     python batch_engine.py -n 4096 --ticks 2000
+#     python batch_engine.py --verify 60    # check the rules against SnakeEngine tick by tick
+#
+# Needs numpy (pip install numpy); the game itself doesn't.
+#
+# Games draw from one shared random stream, so a batch reproduces from its
+# seed but a single game won't match SnakeEngine with the same seed.
+#
+# The body is never stored as a list: stamp[g, c] is the move number on which
+# the head last entered cell c, and a cell is part of the body while
+# stamp > moves - size (size = segments on the board, which trails length by
+# one right after eating). The tail therefore "moves" on its own, and moving
+# a snake is one store, however long it is.
+
+import argparse, random, sys, time
+import numpy as np
+import engine
+from autopilot import Autopilot
+from engine import GRID_W, GRID_H, SNAKE_BLOCK, NOOP, UP, RIGHT, DOWN, LEFT
+
+CELLS = GRID_W * GRID_H
+
+# Event bits, one uint8 per game from step()
+EAT, SHIELD_HIT, CRASH, LEVEL_UP = 1, 2, 4, 8
+
+# direction per action (NOOP keeps the current one)
+ACTION_DX = np.array([0, 0, 1, 0, -1], np.int8)
+ACTION_DY = np.array([0, -1, 0, 1, 0], np.int8)
+
+# cells anything can spawn on, and the ones a 30x30 sprite fits in
+ALL_POOL = np.arange(CELLS, dtype=np.int32)
+ROCK_POOL = np.array(sorted(engine.ROCK_CELLS.cells), np.int32)
+
+class BatchEngine:
+    def __init__(self, n, seed=None, fruits=engine.FRUITS, powerup_chance=engine.POWERUP_CHANCE,
+                 start_obstacles=engine.START_OBSTACLES, level_obstacles=engine.LEVEL_OBSTACLES,
+                 rock_chance=1/3, level_thresholds=engine.LEVEL_THRESHOLDS):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        # item kinds: the fruits, then shield and slow
+        self.fruit_count = len(fruits)
+        self.shield_kind, self.slow_kind = len(fruits), len(fruits) + 1
+        self.kind_names = [f[0] for f in fruits] + list(engine.POWERUPS)
+        self.kind_size = np.array([f[1] for f in fruits] + [engine.POWERUP_SIZE] * 2, np.int16)
+        self.kind_pts = np.array([f[2] for f in fruits] + [0, 0], np.int32)
+        self.powerup_chance = powerup_chance
+        self.start_obstacles = start_obstacles
+        self.level_obstacles = level_obstacles
+        self.rock_chance = rock_chance
+        self.thresholds = np.array(list(level_thresholds) + [np.iinfo(np.int32).max], np.int32)
+
+        self.stamp = np.zeros((n, CELLS), np.int32)
+        self.rocks = np.zeros((n, CELLS), bool)
+        # flat views: indexing with game*CELLS + cell is much cheaper than [game, cell]
+        self.stamp_flat = self.stamp.reshape(-1)
+        self.rocks_flat = self.rocks.reshape(-1)
+        self.moves = np.zeros(n, np.int32)
+        self.x = np.zeros(n, np.int16)
+        self.y = np.zeros(n, np.int16)
+        self.dx = np.zeros(n, np.int8)
+        self.dy = np.zeros(n, np.int8)
+        self.length = np.zeros(n, np.int32)     # what the body grows to
+        self.size = np.zeros(n, np.int32)       # segments it has now
+        self.score = np.zeros(n, np.int32)
+        self.level = np.zeros(n, np.int32)
+        self.speed = np.zeros(n, np.float64)
+        self.shield = np.zeros(n, np.int8)
+        self.slow_end = np.zeros(n, np.float64)
+        self.time = np.zeros(n, np.float64)
+        self.ticks = np.zeros(n, np.int32)
+        self.done = np.zeros(n, bool)
+        self.item = np.zeros(n, np.int32)       # cell, -1 when the board is full
+        self.item_kind = np.zeros(n, np.int16)
+        self.reset()
+
+    def reset(self, games=None):
+        # start over every game, or those selected by a bool mask / index array
+        g = np.arange(self.n) if games is None else np.flatnonzero(games) if np.asarray(games).dtype == bool else np.asarray(games)
+        if not len(g):
+            return self
+        cx, cy = GRID_W//2, GRID_H//2
+        self.stamp[g] = 0
+        self.stamp[g, cx + cy*GRID_W] = 1
+        self.rocks[g] = False
+        self.moves[g] = 1
+        self.x[g], self.y[g] = cx, cy
+        self.dx[g] = self.dy[g] = 0
+        self.length[g] = self.size[g] = 1
+        self.score[g] = 0
+        self.level[g] = 1
+        self.speed[g] = engine.INITIAL_SPEED
+        self.shield[g] = 0
+        self.slow_end[g] = self.time[g] = 0.0
+        self.ticks[g] = 0
+        self.done[g] = False
+        self.spawn_items(g)
+        self.spawn_obstacles(g, np.full(len(g), self.start_obstacles), with_item=False)
+        return self
+
+    def occupied(self, g):
+        # (len(g), CELLS) body mask
+        return self.stamp[g] > (self.moves[g] - self.size[g])[:, None]
+
+    def tick_rate(self):
+        slow = self.slow_end > self.time
+        return np.where(slow, np.maximum(5, np.round(self.speed / 2.0)),
+                        np.maximum(engine.FPS_MIN, np.round(self.speed)))
+
+    # ---------------- STEP ----------------
+    def step(self, actions):
+        # one tick for every unfinished game; returns the event bits per game
+        actions = np.asarray(actions)
+        events = np.zeros(self.n, np.uint8)
+        live = ~self.done
+
+        # turns (no 180s)
+        ndx, ndy = ACTION_DX[actions], ACTION_DY[actions]
+        turn = live & (((ndx != 0) & (self.dx == 0)) | ((ndy != 0) & (self.dy == 0)))
+        self.dx = np.where(turn, ndx, self.dx)
+        self.dy = np.where(turn, ndy, self.dy)
+        self.ticks += live
+
+        g = np.flatnonzero(live & ((self.dx != 0) | (self.dy != 0)))
+        nx = self.x[g] + self.dx[g]
+        ny = self.y[g] + self.dy[g]
+
+        # walls: a shield stops the snake
+        wall = (nx < 0) | (nx >= GRID_W) | (ny < 0) | (ny >= GRID_H)
+        w = g[wall]
+        has = self.shield[w] > 0
+        saved = w[has]
+        self.shield[saved] = 0
+        self.dx[saved] = self.dy[saved] = 0
+        events[saved] |= SHIELD_HIT
+        self.crash(w[~has], events)
+        g, nx, ny = g[~wall], nx[~wall], ny[~wall]
+        flat = g * CELLS + nx + ny.astype(np.int32) * GRID_W
+
+        # rocks: a shield smashes the rock
+        hit = self.rocks_flat[flat]
+        smash = hit & (self.shield[g] > 0)
+        self.rocks_flat[flat[smash]] = False
+        self.shield[g[smash]] = 0
+        events[g[smash]] |= SHIELD_HIT
+        self.crash(g[hit & ~smash], events)
+        keep = ~hit | smash
+        g, nx, ny, flat = g[keep], nx[keep], ny[keep], flat[keep]
+
+        # move: the tail leaves first, so the cell it frees is safe to enter
+        moves = self.moves[g] + 1
+        size = np.minimum(self.size[g] + 1, self.length[g])
+        self.moves[g], self.size[g] = moves, size
+        bitten = self.stamp_flat[flat] > moves - size
+        self.stamp_flat[flat] = moves
+        self.x[g], self.y[g] = nx, ny
+        saved = bitten & (self.shield[g] > 0)
+        self.shield[g[saved]] = 0
+        events[g[saved]] |= SHIELD_HIT
+        self.crash(g[bitten & ~saved], events)
+        keep = ~bitten | saved
+        g, flat = g[keep], flat[keep]
+
+        # pickups
+        eat = g[flat - g * CELLS == self.item[g]]
+        if len(eat):
+            kind = self.item_kind[eat]
+            fruit = eat[kind < self.fruit_count]
+            pts = self.kind_pts[kind[kind < self.fruit_count]]
+            self.length[fruit] += 1
+            self.score[fruit] += pts
+            self.speed[fruit] += pts / 40.0
+            self.shield[eat[kind == self.shield_kind]] = 1
+            slow = eat[kind == self.slow_kind]
+            self.slow_end[slow] = self.time[slow] + engine.SLOW_SECONDS
+            events[eat] |= EAT
+            self.spawn_items(eat)
+            self.spawn_obstacles(eat, (self.rng.random(len(eat)) < self.rock_chance).astype(np.int32))
+
+        # level up
+        up = g[self.score[g] >= self.thresholds[self.level[g] - 1]]
+        if len(up):
+            self.level[up] += 1
+            events[up] |= LEVEL_UP
+            self.spawn_obstacles(up, np.full(len(up), self.level_obstacles), with_item=False)
+
+        # like SnakeEngine, at the rate after this tick (eating speeds it up)
+        self.time[live] += 1.0 / self.tick_rate()[live]
+        return events
+
+    def crash(self, g, events):
+        self.done[g] = True
+        events[g] |= CRASH
+
+    # ---------------- SPAWNING ----------------
+    def free_at(self, g, cell):
+        # no body and no rock at cell (arrays of game indices and cells, broadcast together)
+        flat = g * CELLS + cell
+        return (self.stamp_flat[flat] <= (self.moves - self.size)[g]) & ~self.rocks_flat[flat]
+
+    def sample(self, g, pool, ok, tries=6):
+        # one uniformly random cell from pool per game in g for which ok(games, cells)
+        # holds, -1 where there is none. Guesses first (boards are mostly empty), then
+        # draws exactly from the whole pool for the few games still without a cell.
+        cell = np.full(len(g), -1, np.int32)
+        todo = g
+        at = np.arange(len(g))
+        for _ in range(tries):
+            c = pool[self.rng.integers(len(pool), size=len(todo))]
+            good = ok(todo, c)
+            cell[at[good]] = c[good]
+            todo, at = todo[~good], at[~good]
+            if not len(todo):
+                return cell
+        mask = ok(todo[:, None], pool[None, :])
+        keys = self.rng.random(mask.shape)
+        keys[~mask] = -1.0
+        pick = pool[keys.argmax(axis=1)]
+        found = mask.any(axis=1)
+        cell[at[found]] = pick[found]
+        return cell
+
+    def spawn_items(self, g):
+        # new fruit or powerup for games g (see SnakeEngine.spawn_fruit_or_power)
+        rng = self.rng
+        k = len(g)
+        power = rng.random(k) < self.powerup_chance
+        kind = np.where(power, np.where(rng.random(k) < 0.5, self.shield_kind, self.slow_kind),
+                        rng.integers(self.fruit_count, size=k)).astype(np.int16)
+        # sprites bigger than a cell must not hang off the right/bottom edge (if there is room)
+        big = self.kind_size[kind] > SNAKE_BLOCK
+        item = np.full(k, -1, np.int32)
+        item[big] = self.sample(g[big], ROCK_POOL, self.free_at)
+        rest = item < 0
+        item[rest] = self.sample(g[rest], ALL_POOL, self.free_at)
+        self.item[g] = item
+        self.item_kind[g] = kind
+
+    def spawn_obstacles(self, g, counts, with_item=True):
+        # counts[i] rocks for game g[i], never within one cell of the head (or the item)
+        item = self.item
+        def ok(games, cells):
+            cx, cy = cells % GRID_W, cells // GRID_W
+            good = self.free_at(games, cells) & (cells != item[games])
+            good &= (np.abs(cx - self.x[games]) > 1) | (np.abs(cy - self.y[games]) > 1)
+            if with_item:
+                it = item[games]
+                good &= (it < 0) | (np.abs(cx - it % GRID_W) > 1) | (np.abs(cy - it // GRID_W) > 1)
+            return good
+        for r in range(int(counts.max(initial=0))):
+            want = g[counts > r]
+            cell = self.sample(want, ROCK_POOL, ok)
+            got = cell >= 0
+            self.rocks_flat[want[got] * CELLS + cell[got]] = True
+
+# ---------------- POLICIES ----------------
+def greedy_actions(batch):
+    # head for the item by Manhattan distance, skipping moves that die on the spot
+    g = np.arange(batch.n)
+    tail = batch.moves - batch.size         # stamps up to this are no longer body
+    best = np.full(batch.n, NOOP, np.int8)
+    best_dist = np.full(batch.n, np.iinfo(np.int32).max, np.int64)
+    ix = np.where(batch.item >= 0, batch.item % GRID_W, batch.x)
+    iy = np.where(batch.item >= 0, batch.item // GRID_W, batch.y)
+    for action in (UP, RIGHT, DOWN, LEFT):
+        dx, dy = ACTION_DX[action], ACTION_DY[action]
+        nx, ny = batch.x + dx, batch.y + dy
+        inside = (nx >= 0) & (nx < GRID_W) & (ny >= 0) & (ny < GRID_H)
+        cell = np.where(inside, nx + ny*GRID_W, 0)
+        flat = g * CELLS + cell
+        stamp = batch.stamp_flat[flat]
+        # the tail cell empties as the head moves, unless the snake is growing
+        body = (stamp > tail) & ~((stamp == tail + 1) & (batch.size == batch.length))
+        ok = (inside & ~batch.rocks_flat[flat] & ~body
+              & ~((batch.dx == -dx) & (batch.dy == -dy) & ((dx != 0) | (dy != 0))))
+        dist = np.abs(ix - nx).astype(np.int64) + np.abs(iy - ny)
+        better = ok & (dist < best_dist)
+        best[better] = action
+        best_dist[better] = dist[better]
+    return best
+
+# ---------------- CROSS-CHECK ----------------
+EVENT_BITS = {engine.EAT: EAT, engine.SHIELD_HIT: SHIELD_HIT, engine.CRASH: CRASH, engine.LEVEL_UP: LEVEL_UP}
+
+def copy_spawns(game, batch):
+    # give game 0 of the batch the SnakeEngine's rocks and item: the two draw
+    # from different random streams, everything else has to follow by the rules
+    batch.rocks[0] = False
+    for x, y in game.obstacles:
+        batch.rocks[0, x + y*GRID_W] = True
+    if game.item is None:
+        batch.item[0] = -1
+    else:
+        kind, x, y = game.item[:3]
+        batch.item[0] = x + y*GRID_W
+        batch.item_kind[0] = batch.kind_names.index(kind)
+
+def snapshot(game):
+    return (game.x, game.y, game.dx, game.dy, game.length, len(game.snake), game.score, game.level,
+            game.shield, game.done, game.ticks, round(game.time, 6))
+
+def batch_snapshot(batch):
+    return (int(batch.x[0]), int(batch.y[0]), int(batch.dx[0]), int(batch.dy[0]),
+            int(batch.length[0]), int(batch.size[0]), int(batch.score[0]), int(batch.level[0]),
+            int(batch.shield[0]), bool(batch.done[0]), int(batch.ticks[0]), round(float(batch.time[0]), 6))
+
+def verify(games, max_ticks=3000, seed=1):
+    # play each game on a SnakeEngine and a batch of one side by side (autopilot
+    # moves, some random turns and free shields so crashes and smashes happen
+    # too) and compare state, events and body every tick; returns (mismatching games, ticks)
+    bad = ticks = 0
+    for i in range(games):
+        game = engine.SnakeEngine(seed + i)
+        batch = BatchEngine(1, seed + i)
+        copy_spawns(game, batch)
+        pilot = Autopilot()
+        rng = random.Random(seed + i)
+        while not game.done and game.ticks < max_ticks:
+            action = pilot.action(game) if rng.random() < 0.97 else rng.choice(engine.ACTIONS)
+            if rng.random() < 0.01:
+                game.shield = batch.shield[0] = 1
+            events = sum(EVENT_BITS[e] for e in set(game.step(action)))
+            got = int(batch.step(np.array([action]))[0])
+            ticks += 1
+            body = np.frombuffer(bytes(game.occupied), np.uint8).nonzero()[0]
+            if (snapshot(game) != batch_snapshot(batch) or events != got
+                    or not np.array_equal(body, batch.occupied(np.array([0]))[0].nonzero()[0])):
+                bad += 1
+                print("MISMATCH game %d tick %d: engine %r events %d, batch %r events %d"
+                      % (i, game.ticks, snapshot(game), events, batch_snapshot(batch), got))
+                break
+            copy_spawns(game, batch)
+    return bad, ticks
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a batch of headless Snake games")
+    parser.add_argument("-n", "--games", type=int, default=4096)
+    parser.add_argument("--ticks", type=int, default=1000, help="batch steps to run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--policy", choices=("greedy", "random"), default="greedy")
+    parser.add_argument("--verify", type=int, metavar="GAMES",
+                        help="instead, compare this many games tick by tick with engine.SnakeEngine")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        start = time.perf_counter()
+        bad, ticks = verify(args.verify, seed=args.seed)
+        print("%d games, %d mismatches, %d ticks in %.2fs"
+              % (args.verify, bad, ticks, time.perf_counter() - start))
+        return 1 if bad else 0
+
+    batch = BatchEngine(args.games, args.seed)
+    rng = np.random.default_rng(args.seed)
+    scores, lengths = [], []
+    game_ticks = 0
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        if args.policy == "greedy":
+            actions = greedy_actions(batch)
+        else:
+            actions = rng.integers(len(engine.ACTIONS), size=batch.n)
+        game_ticks += int((~batch.done).sum())
+        batch.step(actions)
+        if batch.done.any():
+            scores.extend(batch.score[batch.done].tolist())
+            lengths.extend(batch.length[batch.done].tolist())
+            batch.reset(batch.done)
+    took = time.perf_counter() - start
+    print("%d game ticks in %.2fs: %.0f ticks/s" % (game_ticks, took, game_ticks / took))
+    if scores:
+        s = np.array(scores)
+        print("%d games finished: score mean %.1f, p50 %d, p90 %d, max %d; mean length %.1f"
+              % (len(s), s.mean(), np.percentile(s, 50), np.percentile(s, 90), s.max(), np.mean(lengths)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
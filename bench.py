@@ -0,0 +1,276 @@
+# bench.py — timings for the render and simulation hot paths
+#
+# Runs with SDL's dummy video/audio drivers, so no window or sound card is
+# needed, and writes per-call timings as JSON so two commits can be compared:
+#
+#     python bench.py -o before.json
+#     ... change things ...
+#     python bench.py -o after.json
+#     python bench.py --compare before.json after.json
+#
+# --compare exits with status 1 if any benchmark got slower than --threshold.
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse, json, platform, random, statistics, subprocess, sys, time
+import pygame
+import engine
+import snake
+import netplay
+try:
+    import batch_engine     # needs numpy, which the game doesn't
+except ImportError:
+    batch_engine = None
+
+SNAKE_LENGTHS = [10, 100, 1000, 10000]
+PARTICLE_COUNTS = [0, 100, 1000, 5000]
+ROCK_DENSITIES = [0.0, 0.25, 0.5, 0.75, 0.95]
+
+def timeit(fn, repeat, setup=None):
+    # per-call seconds for `repeat` calls of fn(); setup() runs untimed before each call
+    samples = []
+    for _ in range(repeat):
+        if setup: setup()
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return {
+        "calls": repeat,
+        "min_us": min(samples) * 1e6,
+        "median_us": statistics.median(samples) * 1e6,
+        "mean_us": statistics.fmean(samples) * 1e6,
+    }
+
+def serpentine(n):
+    # n pixel positions snaking row by row over the board (wrapping once it is full)
+    cells = []
+    for y in range(engine.GRID_H):
+        row = range(engine.GRID_W) if y % 2 == 0 else range(engine.GRID_W-1, -1, -1)
+        cells.extend((x * engine.SNAKE_BLOCK, y * engine.SNAKE_BLOCK) for x in row)
+    return [cells[i % len(cells)] for i in range(n)]
+
+# ---------------- BENCHMARKS ----------------
+def bench_draw_snake(quick):
+    results = {}
+    for n in SNAKE_LENGTHS:
+        body = serpentine(n)
+        snake.draw_snake(body, head_dir=(1,0), shield_strength=1)     # build the sprite atlas first
+        results[str(n)] = timeit(lambda: snake.draw_snake(body, head_dir=(1,0), shield_strength=1),
+                                 5 if quick else max(10, 20000 // n))
+    return results
+
+def bench_update_particles(quick):
+    results = {}
+    ps = snake.particles
+    for n in PARTICLE_COUNTS:
+        def setup():
+            ps.clear()
+            for i in range(0, n, 14):
+                ps.spawn(400 + i % 300, 300, count=min(14, n - i))
+        results[str(n)] = timeit(snake.update_particles, 5 if quick else 50, setup)
+    ps.clear()
+    return results
+
+def bench_spawn_obstacles(quick):
+    results = {}
+    for density in ROCK_DENSITIES:
+        game = engine.SnakeEngine(1)
+        game.spawn_obstacles(int(len(engine.ROCK_CELLS) * density) - len(game.obstacles))
+        spawned = []
+        def reset():
+            # untimed: take the last call's rock away so the density stays put
+            for (x, y) in spawned:
+                game.remove_obstacle(x, y)
+            del spawned[:]
+        def spawn():
+            spawned.extend(game.spawn_obstacles(1, avoid_positions=[(game.x, game.y)]))
+        results["%.2f" % density] = timeit(spawn, 50 if quick else 2000, reset)
+        reset()
+    return results
+
+def bench_engine_step(quick):
+    # headless simulation: random play, restarting on every crash
+    game = engine.SnakeEngine(1)
+    rng = random.Random(2)
+    actions = [rng.choice(engine.ACTIONS) for _ in range(4096)]
+    ticks = 20000 if quick else 200000
+    def run():
+        step, reset = game.step, game.reset
+        for i in range(ticks):
+            step(actions[i & 4095])
+            if game.done:
+                reset(i)
+    r = timeit(run, 1 if quick else 3)
+    for k in ("min_us", "median_us", "mean_us"):
+        r[k] /= ticks
+    r["calls"] *= ticks
+    return {"random_play": r}
+
+def bench_batch_step(quick):
+    # vectorized engine: cost per game tick, greedy policy, finished games restarted
+    results = {}
+    for n in (256, 4096):
+        batch = batch_engine.BatchEngine(n, 1)
+        steps = 20 if quick else 200
+        def run():
+            for _ in range(steps):
+                batch.step(batch_engine.greedy_actions(batch))
+                batch.reset(batch.done)
+        r = timeit(run, 1 if quick else 3)
+        for k in ("min_us", "median_us", "mean_us"):
+            r[k] /= steps * n
+        r["calls"] *= steps * n
+        results[str(n)] = r
+    return results
+
+def bench_arena_step(quick):
+    # one multiplayer room tick: random turns, crashed snakes respawning, records encoded
+    results = {}
+    for n in (4, 16):
+        arena = netplay.Arena(seed=1)
+        for _ in range(n):
+            arena.add_snake()
+        rng = random.Random(2)
+        inputs = [(rng.randrange(n), rng.choice(engine.ACTIONS)) for _ in range(4096)]
+        ticks = 200 if quick else 2000
+        def run():
+            for i in range(ticks):
+                sid, action = inputs[i & 4095]
+                arena.push_input(sid, action, i)
+                b"".join(arena.step())
+        r = timeit(run, 1 if quick else 3)
+        for k in ("min_us", "median_us", "mean_us"):
+            r[k] /= ticks
+        r["calls"] *= ticks
+        results[str(n)] = r
+    return results
+
+class _StopLoop(Exception):
+    pass
+
+def bench_game_loop(quick):
+    # one frame of game_loop = one engine tick + a full render. The fake clock
+    # reports exactly one tick of elapsed time per frame and times the frames;
+    # the engine is given a fresh shield every tick so the run never ends.
+    frames = 60 if quick else 600
+    samples = []
+    last = [None]
+    game_ref = []
+
+    class Immortal(engine.SnakeEngine):
+        def __init__(self, seed=None):
+            super().__init__(1)
+            game_ref.append(self)
+        def step(self, action=engine.NOOP):
+            self.shield = 1
+            # steer toward the item so the snake grows and eats
+            if self.item is not None:
+                ix, iy = self.item[1:3]
+                action = (engine.RIGHT if ix > self.x else engine.LEFT if ix < self.x
+                          else engine.DOWN if iy > self.y else engine.UP)
+            return super().step(action)
+
+    class FrameClock:
+        def tick(self, fps=0):
+            t = time.perf_counter()
+            if last[0] is not None:
+                samples.append(t - last[0])
+            if len(samples) >= frames:
+                raise _StopLoop
+            last[0] = time.perf_counter()
+            return 1000.0 / game_ref[0].tick_rate() if game_ref else 16
+
+    real_engine, real_clock = snake.engine.SnakeEngine, snake.clock
+    snake.engine.SnakeEngine, snake.clock = Immortal, FrameClock()
+    try:
+        snake.game_loop()
+    except _StopLoop:
+        pass
+    finally:
+        snake.engine.SnakeEngine, snake.clock = real_engine, real_clock
+    return {"frame": {
+        "calls": len(samples),
+        "min_us": min(samples) * 1e6,
+        "median_us": statistics.median(samples) * 1e6,
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "final_length": len(game_ref[0].snake),
+    }}
+
+BENCHMARKS = {
+    "draw_snake": bench_draw_snake,
+    "update_particles": bench_update_particles,
+    "spawn_obstacles": bench_spawn_obstacles,
+    "engine_step": bench_engine_step,
+    "game_loop": bench_game_loop,
+    "arena_step": bench_arena_step,
+}
+if batch_engine is not None:
+    BENCHMARKS["batch_step"] = bench_batch_step
+
+# ---------------- RESULTS ----------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=snake.BASE_DIR or ".",
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def run(names, quick):
+    snake.init_display()
+    results = {}
+    for name in names:
+        print("running", name, file=sys.stderr)
+        results[name] = BENCHMARKS[name](quick)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "quick": quick,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def compare(old, new, threshold):
+    # print median per-call times side by side; returns the number of regressions
+    regressions = 0
+    print("%-32s %12s %12s %8s" % ("benchmark", "old us", "new us", "ratio"))
+    for name, cases in new["results"].items():
+        for case, r in cases.items():
+            o = old["results"].get(name, {}).get(case)
+            if o is None:
+                continue
+            ratio = r["median_us"] / o["median_us"] if o["median_us"] else 1.0
+            flag = ""
+            if ratio > threshold:
+                regressions += 1
+                flag = "  SLOWER"
+            print("%-32s %12.1f %12.1f %7.2fx%s" % ("%s[%s]" % (name, case), o["median_us"], r["median_us"], ratio, flag))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snake hot-path benchmarks")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("-b", "--bench", action="append", choices=sorted(BENCHMARKS), help="only run these (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="few repetitions, for a smoke test")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f: old = json.load(f)
+        with open(args.compare[1]) as f: new = json.load(f)
+        return 1 if compare(old, new, args.threshold) else 0
+
+    data = run(args.bench or list(BENCHMARKS), args.quick)
+    with open(args.output, "w") as f:
+        json.dump(data, f, indent=2)
+    print("wrote", args.output, file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
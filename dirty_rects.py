@@ -0,0 +1,46 @@
+# dirty_rects.py — redraw and flip only the parts of the screen that changed
+#
+# Each frame the regions drawn last frame are painted back from the static
+# background (the level with its rocks, see static_layer.py), the moving
+# things are drawn again and recorded, and display.update() gets last frame's
+# rects and this frame's rects instead of the whole window.
+#
+#     dirty.restore(screen, background)
+#     dirty.add(screen.blit(img, pos))
+#     dirty.flip()
+#
+# Call invalidate() whenever the static picture changes (new level, rock
+# spawned or smashed, after an overlay); the next frame is then redrawn and
+# flipped in full.
+
+import pygame
+
+class DirtyRects:
+    def __init__(self):
+        self.prev = []
+        self.cur = []
+        self.full = True
+
+    def invalidate(self):
+        self.full = True
+
+    def add(self, rect):
+        self.cur.append(rect)
+
+    def extend(self, rects):
+        self.cur.extend(rects)
+
+    def restore(self, surface, background):
+        if self.full:
+            surface.blit(background, (0,0))
+            return
+        for r in self.prev:
+            surface.blit(background, r, r)
+
+    def flip(self):
+        if self.full:
+            pygame.display.update()
+            self.full = False
+        else:
+            pygame.display.update(self.prev + self.cur)
+        self.prev, self.cur = self.cur, []
@@ -0,0 +1,396 @@
+# engine.py — Snake rules without pygame (no display, no clock, no sound)
+#
+# snake.py drives one of these per game and only draws what it reports.
+# It can also be stepped on its own as fast as Python allows:
+#
+#     game = SnakeEngine()
+#     game.reset(seed=1)
+#     while not game.done:
+#         game.step(random.choice(ACTIONS))
+
+import random
+from collections import deque
+
+# ---------------- CONFIG ----------------
+WIDTH, HEIGHT = 800, 600
+SNAKE_BLOCK = 20
+INITIAL_SPEED = 6.0
+FPS_MIN = 5
+
+GRID_W, GRID_H = WIDTH // SNAKE_BLOCK, HEIGHT // SNAKE_BLOCK
+
+LEVEL_THRESHOLDS = [100, 200, 300]
+START_OBSTACLES = 5
+LEVEL_OBSTACLES = 2
+POWERUP_CHANCE = 0.12   # 12% chance for powerup (shield or slow), else a fruit
+SLOW_SECONDS = 5.0
+ROCK_SIZE = 30
+POWERUP_SIZE = 25
+
+# FRUITS: (name, display_size, points)
+FRUITS = [
+    ("apple", 20, 10),
+    ("banana", 25, 20),
+    ("berry", 18, 30),
+    ("golden", 30, 50),
+]
+POWERUPS = ("shield", "slow")
+
+# Actions (one per tick). NOOP keeps the current direction.
+NOOP, UP, RIGHT, DOWN, LEFT = range(5)
+ACTIONS = (NOOP, UP, RIGHT, DOWN, LEFT)
+DIRECTIONS = {UP: (0,-1), RIGHT: (1,0), DOWN: (0,1), LEFT: (-1,0)}
+
+# Events returned by step()
+EAT = "eat"                 # fruit or powerup picked up at the head cell
+SHIELD_HIT = "shield_hit"   # shield absorbed a crash
+CRASH = "crash"             # game over
+LEVEL_UP = "level_up"
+
+# ---------------- CELL SET ----------------
+class CellSet:
+    # Set of cell ids (x + y*grid_w) with O(1) add, discard and uniform choice:
+    # cells are packed in a list and index maps each cell to its slot.
+
+    def __init__(self, cells=()):
+        self.cells = []
+        self.index = {}
+        for c in cells:
+            self.add(c)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, c):
+        return c in self.index
+
+    def add(self, c):
+        if c not in self.index:
+            self.index[c] = len(self.cells)
+            self.cells.append(c)
+
+    def discard(self, c):
+        i = self.index.pop(c, None)
+        if i is None:
+            return False
+        last = self.cells.pop()
+        if last != c:
+            # move the last cell into the hole
+            self.cells[i] = last
+            self.index[last] = i
+        return True
+
+    def copy(self):
+        new = CellSet()
+        new.cells = self.cells[:]
+        new.index = self.index.copy()
+        return new
+
+    def choice(self, rng):
+        return self.cells[rng.randrange(len(self.cells))]
+
+_board_cells = {}
+
+def board_cells(w, h):
+    # (every cell, cells a rock fits in) of a w x h board, built once per size;
+    # shared between games, so copy() before changing them.
+    # Rocks (and the bigger items) are drawn 30x30 from their cell, so keep them
+    # off the last column/row.
+    cells = _board_cells.get((w, h))
+    if cells is None:
+        cells = _board_cells[w, h] = (
+            CellSet(range(w * h)),
+            CellSet(x + y*w
+                    for y in range((h*SNAKE_BLOCK - ROCK_SIZE)//SNAKE_BLOCK + 1)
+                    for x in range((w*SNAKE_BLOCK - ROCK_SIZE)//SNAKE_BLOCK + 1)))
+    return cells
+
+ALL_CELLS, ROCK_CELLS = board_cells(GRID_W, GRID_H)
+
+# ---------------- RULES ----------------
+# One snake's share of a tick. SnakeEngine runs these on itself and
+# netplay.Arena runs them for every snake in a room, so both play by the same
+# rules. `s` has SnakeEngine's per-snake fields (x, y, dx, dy, shield, length,
+# score, speed, slow_end, level); `board` has grid_w, grid_h, rocks and
+# remove_obstacle(x, y).
+
+def can_turn(action, dx, dy):
+    # no 180-degree turns (and no repeats)
+    d = DIRECTIONS.get(action)
+    return d is not None and ((d[0] != 0 and dx == 0) or (d[1] != 0 and dy == 0))
+
+def tick_rate(s, now):
+    # moves per second (account for slow powerup); now is in s.slow_end's unit
+    if s.slow_end > now:
+        return max(5, int(round(s.speed / 2.0)))
+    return max(FPS_MIN, int(round(s.speed)))
+
+def advance(s, board, events):
+    # the cell (x, y) the head moves into, None if it stays put. A shield stops
+    # the snake at a wall and smashes a rock; without one both append CRASH.
+    x, y = s.x + s.dx, s.y + s.dy
+    if x < 0 or x >= board.grid_w or y < 0 or y >= board.grid_h:
+        if s.shield > 0:
+            s.shield = 0
+            s.dx, s.dy = 0, 0
+            events.append(SHIELD_HIT)
+        else:
+            events.append(CRASH)
+        return None
+    if board.rocks[x + y*board.grid_w]:
+        if s.shield > 0:
+            s.shield = 0
+            board.remove_obstacle(x, y)
+            events.append(SHIELD_HIT)
+        else:
+            events.append(CRASH)
+            return None
+    return x, y
+
+def collide(s, events):
+    # the head moved onto a body segment: a shield absorbs it, else it is a crash (True)
+    if s.shield > 0:
+        s.shield = 0
+        events.append(SHIELD_HIT)
+        return False
+    events.append(CRASH)
+    return True
+
+def eat(s, kind, pts, now, slow_for=SLOW_SECONDS):
+    # item effects; now and slow_for in s.slow_end's unit
+    if kind == "shield":
+        s.shield = 1
+    elif kind == "slow":
+        s.slow_end = now + slow_for
+    else:
+        s.length += 1
+        s.score += pts
+        s.speed += pts / 40.0
+
+def level_up(s):
+    # level up at 100,200,300...; True if s just did
+    if s.level <= len(LEVEL_THRESHOLDS) and s.score >= LEVEL_THRESHOLDS[s.level-1]:
+        s.level += 1
+        return True
+    return False
+
+# ---------------- INPUT ----------------
+class InputQueue:
+    # Turns pressed between ticks. step() should get one pop() per tick, so two quick
+    # presses turn on two consecutive ticks instead of the second overwriting the first.
+    # Each press is checked against the direction the snake will have after the turns
+    # already queued, so LEFT-DOWN-RIGHT can't fold the snake back onto itself.
+
+    def __init__(self, maxlen=3):
+        self.maxlen = maxlen
+        self.turns = deque()
+
+    def __len__(self):
+        return len(self.turns)
+
+    def clear(self):
+        self.turns.clear()
+
+    def push(self, action, game):
+        if len(self.turns) >= self.maxlen:
+            return False
+        ldx, ldy = DIRECTIONS[self.turns[-1]] if self.turns else (game.dx, game.dy)
+        # same 180-degree rule as SnakeEngine.turn(), also drops repeats
+        if can_turn(action, ldx, ldy):
+            self.turns.append(action)
+            return True
+        return False
+
+    def pop(self):
+        return self.turns.popleft() if self.turns else NOOP
+
+# ---------------- ENGINE ----------------
+class SnakeEngine:
+    # All positions are grid cells; multiply by SNAKE_BLOCK for pixels.
+    grid_w, grid_h = GRID_W, GRID_H     # world size in cells (see world.py for big ones)
+
+    def __init__(self, seed=None):
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # every random choice comes from this seed, so a seed plus the action taken
+        # on each tick reproduces a game exactly (see replay.py)
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.x, self.y = self.grid_w//2, self.grid_h//2
+        self.dx, self.dy = 0, 0
+        self.head_dir = (0,0)
+        # body runs tail -> head; occupied counts segments per cell (x + y*grid_w)
+        # so moving and self collision cost O(1) however long the snake gets
+        self.snake = deque([(self.x, self.y)])
+        self.new_board()
+        self.occupied[self.x + self.y*self.grid_w] = 1
+        self._block(self.x + self.y*self.grid_w)
+        self.length = 1
+        self.score = 0
+        self.level = 1
+        self.speed = float(INITIAL_SPEED)
+        self.shield = 0
+        self.slow_end = 0.0
+        self.time = 0.0     # simulated seconds, advanced by 1/tick_rate() per step
+        self.ticks = 0
+        self.done = False
+        # what the last step did to the body, for renderers that interpolate between ticks
+        self.moved = False
+        self.last_tail = None   # cell the tail left, None if the snake grew instead
+
+        self.rock_version = 0   # bumped whenever a rock appears or is smashed
+
+        # spawn initial item and obstacles (avoid starting near center)
+        self.item = self.spawn_fruit_or_power()
+        self.spawn_obstacles(START_OBSTACLES, avoid_positions=[(self.x, self.y)])
+        return self
+
+    def new_board(self):
+        # empty body grid and rocks: flat arrays over the whole board
+        w, h = self.grid_w, self.grid_h
+        self.occupied = bytearray(w * h)
+        # free: cells with no snake, rock or item. rock_cells: the free cells a
+        # 30x30 sprite fits in (rock_area: all the cells it fits in). Both are
+        # kept up to date as things move.
+        all_cells, self.rock_area = board_cells(w, h)
+        self.free = all_cells.copy()
+        self.rock_cells = self.rock_area.copy()
+        # rocks: list for drawing, grid for O(1) collision
+        self.obstacles = []
+        self.rocks = bytearray(w * h)
+
+    def tick_rate(self):
+        # ticks per second
+        return tick_rate(self, self.time)
+
+    def turn(self, action):
+        # prevent 180-degree turns
+        if can_turn(action, self.dx, self.dy):
+            self.dx, self.dy = self.head_dir = DIRECTIONS[action]
+            return True
+        return False
+
+    def step(self, action=NOOP):
+        if self.done:
+            return ()
+        events = []
+        self.turn(action)
+        self.ticks += 1
+        self.moved = False
+        if self.dx or self.dy:
+            self._move(events)
+        self.time += 1.0 / self.tick_rate()
+        return events
+
+    def _block(self, c):
+        self.free.discard(c)
+        self.rock_cells.discard(c)
+
+    def _unblock(self, c):
+        self.free.add(c)
+        if c in self.rock_area:
+            self.rock_cells.add(c)
+
+    def _move(self, events):
+        # walls and rocks
+        to = advance(self, self, events)
+        if to is None:
+            self.done = CRASH in events
+            return
+
+        x, y = self.x, self.y = to
+        w = self.grid_w
+        self.moved = True
+        self.last_tail = None
+        occupied = self.occupied
+        cell = x + y*w
+        self.snake.append((x, y))
+        occupied[cell] += 1
+        if occupied[cell] == 1:
+            self._block(cell)
+        if len(self.snake) > self.length:
+            tx, ty = self.last_tail = self.snake.popleft()
+            tail = tx + ty*w
+            occupied[tail] -= 1
+            if not occupied[tail]:
+                self._unblock(tail)
+
+        # self collision (the head itself accounts for one)
+        if occupied[cell] > 1 and collide(self, events):
+            self.done = True
+            return
+
+        # pickups (items spawn on exact grid cells, so equality is OK)
+        if self.item is not None and (x, y) == self.item[1:3]:
+            kind, ix, iy, size, pts = self.item
+            eat(self, kind, pts, self.time)
+            events.append(EAT)
+            # spawn next and maybe add obstacle
+            self.item = self.spawn_fruit_or_power()
+            if self.rng.randint(1,3) == 1:
+                avoid = [(x, y)] if self.item is None else [(x, y), self.item[1:3]]
+                self.spawn_obstacles(1, avoid_positions=avoid)
+
+        if level_up(self):
+            self.spawn_obstacles(LEVEL_OBSTACLES, avoid_positions=[(x, y)])
+            events.append(LEVEL_UP)
+
+    # ---------------- SPAWNING ----------------
+    def pick_item(self):
+        # (kind, display_size, points); kind is a fruit name or powerup
+        rng = self.rng
+        if rng.random() < POWERUP_CHANCE:
+            kind = "shield" if rng.random() < 0.5 else "slow"
+            return kind, POWERUP_SIZE, 0
+        return rng.choice(FRUITS)
+
+    def spawn_fruit_or_power(self):
+        # returns (kind, x, y, display_size, points) on a free cell, or None if the board is full
+        rng = self.rng
+        kind, size, pts = self.pick_item()
+        # sprites bigger than a cell must not hang off the right/bottom edge
+        pool = self.rock_cells if size > SNAKE_BLOCK and len(self.rock_cells) else self.free
+        if not len(pool):
+            return None
+        c = pool.choice(rng)
+        self._block(c)
+        w = self.grid_w
+        return (kind, c % w, c // w, size, pts)
+
+    def spawn_obstacles(self, n, avoid_positions=None):
+        # place up to n rocks, never within one cell of avoid_positions; returns the new ones.
+        # Samples straight from the cells that can take a rock, so it only comes
+        # back short when the board has no room left.
+        rng, w = self.rng, self.grid_w
+        pool = self.rock_cells
+        held = []
+        for (ax, ay) in avoid_positions or ():
+            for cy in range(max(0, ay-1), min(self.grid_h, ay+2)):
+                for cx in range(max(0, ax-1), min(w, ax+2)):
+                    c = cx + cy*w
+                    if pool.discard(c):
+                        held.append(c)
+        obs = []
+        while len(obs) < n and len(pool):
+            c = pool.choice(rng)
+            self._block(c)
+            self.rocks[c] = 1
+            obs.append((c % w, c // w))
+        for c in held:
+            pool.add(c)
+        if obs:
+            self.obstacles.extend(obs)
+            self.rock_version += 1
+        return obs
+
+    def remove_obstacle(self, x, y):
+        c = x + y*self.grid_w
+        if not self.rocks[c]:
+            return
+        self.rocks[c] = 0
+        self.obstacles.remove((x, y))
+        self.rock_version += 1
+        self._unblock(c)
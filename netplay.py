@@ -0,0 +1,892 @@
+# netplay.py — several snakes in one arena, served to clients over asyncio TCP
+#
+# The server is authoritative. Each room runs an Arena (engine.py's rules for
+# many snakes on one board) and every room steps on the same timer. After a
+# tick a client is only sent what changed: heads that moved and whether the
+# tail followed, items and rocks that appeared or went, snakes that died,
+# (re)spawned or picked something up. A client keeps a mirror of its room
+# from those deltas and predicts its own snake from the turns it has sent but
+# the server hasn't applied yet, so steering doesn't wait for the round trip.
+#
+#     python netplay.py serve                       # on localhost:7777
+#     python netplay.py play --room lobby           # pygame client (arrow keys)
+#     python netplay.py bots -n 40 --rooms 8        # loopback bot clients
+#     python netplay.py selftest -n 200 --rooms 20  # server + bots in one process, checks every mirror
+
+import argparse, asyncio, random, struct, sys, time
+from collections import deque
+import engine
+from engine import SnakeEngine, CellSet, DIRECTIONS, NOOP, UP, RIGHT, DOWN, LEFT, FRUITS, POWERUPS, SNAKE_BLOCK
+from engine import SHIELD_HIT, CRASH, can_turn
+
+# ---------------- CONFIG ----------------
+HOST, PORT = "127.0.0.1", 7777
+TICK_RATE = 20          # arena ticks per second: the fastest a snake can go (see moves_on())
+ARENA_W, ARENA_H = engine.GRID_W, engine.GRID_H
+MAX_PLAYERS = 16        # per room
+ITEMS = 3               # items on the board at once
+MAX_ROCKS = 60          # a room runs for good, so rocks stop piling up here
+RESPAWN_TICKS = 20
+SPAWN_TRIES = 32
+INPUT_QUEUE = 3         # turns a player may have waiting, like engine.InputQueue
+MAX_PREDICT = 5         # ticks a client predicts past the newest state it has
+MAX_BUFFER = 256 * 1024 # bytes waiting to go out to a client before it is dropped as too slow
+MAX_MESSAGE = 256       # longest message a client may send
+MAX_LAG = 5             # ticks the server may fall behind before it stops catching up
+
+KINDS = [name for name, _, _ in FRUITS] + list(POWERUPS)
+KIND_INDEX = {kind: i for i, kind in enumerate(KINDS)}
+POINTS = {KIND_INDEX[name]: pts for name, _, pts in FRUITS}
+DIR_ACTION = {d: a for a, d in DIRECTIONS.items()}
+DIR_ACTION[(0,0)] = NOOP
+
+def moves_on(s, tick, rate):
+    # does s move on this tick? Its engine.tick_rate() moves a second, spread
+    # evenly over the arena's rate ticks; worked out from the tick alone, so a
+    # client predicts it from the same fields the server sends
+    r = min(engine.tick_rate(s, tick), rate)
+    return tick * r // rate != (tick - 1) * r // rate
+
+# ---------------- PROTOCOL ----------------
+# Every message is a u32 length and then that many bytes, the first of which is
+# its type; all numbers are little-endian. Cells are x + y*w, as in engine.py.
+#
+#   client -> server   JOIN   room name (utf-8)
+#                      INPUT  seq u32, action u8 (seq counts up from 1)
+#   server -> client   SNAPSHOT  tick u32, ack u32, your id u8, w u16, h u16, rate u8, records
+#                      DELTA     tick u32, ack u32, records
+#
+# ack is the newest INPUT seq the server is done with (applied or dropped). A
+# SNAPSHOT is sent on the first tick after joining and describes the room from
+# scratch; each later tick brings a DELTA with the records of that tick:
+#
+#   MOVE   id, head u16          head moved to cell head and the tail cell left
+#                                (the client holds the body, so it knows which)
+#   GROW   id, head u16          head moved, the tail stayed
+#   SPAWN  id, cell u16          (re)spawned there, length 1, standing still
+#   DIE    id                    crashed: body gone until it respawns
+#   LEAVE  id                    player left the room
+#   STATUS id, score u32, length u16, shield u8, slow_end u32 (a tick), dir u8 (an action),
+#          speed f32, level u8
+#   ITEM   slot u8, kind u8, cell u16   kind indexes KINDS; NO_ITEM empties the slot
+#   ROCK   cell u16 / UNROCK cell u16
+#   BODY   id, dir u8, n u16, n cells u16   a whole snake, tail first (snapshots only)
+
+JOIN, INPUT, SNAPSHOT, DELTA = range(4)
+MOVE, GROW, SPAWN, DIE, LEAVE, STATUS, ITEM, ROCK, UNROCK, BODY = range(1, 11)
+NO_ITEM = 255
+
+LENGTH = struct.Struct("<I")
+INPUT_MSG = struct.Struct("<BIB")
+SNAP_HEAD = struct.Struct("<BIIBHHB")
+DELTA_HEAD = struct.Struct("<BII")
+REC_CELL = struct.Struct("<BBH")        # MOVE, GROW, SPAWN
+REC_ID = struct.Struct("<BB")           # DIE, LEAVE
+REC_STATUS = struct.Struct("<BBIHBIBfB")
+REC_ITEM = struct.Struct("<BBBH")
+REC_ROCK = struct.Struct("<BH")         # ROCK, UNROCK
+REC_BODY = struct.Struct("<BBBH")
+
+def frame(*parts):
+    # one length-prefixed message
+    n = sum(len(p) for p in parts)
+    return LENGTH.pack(n) + b"".join(parts)
+
+async def read_message(reader, limit=None):
+    n, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    if not n or (limit and n > limit):
+        raise ConnectionError("bad message length %d" % n)
+    return await reader.readexactly(n)
+
+# ---------------- ARENA ----------------
+class ArenaSnake:
+    # one player's snake, with the per-snake fields engine.py's rules work on
+    def __init__(self, sid):
+        self.id = sid
+        self.body = deque()     # cells, tail -> head
+        self.x = self.y = 0     # head
+        self.dx, self.dy = 0, 0
+        self.length = 1
+        self.score = 0
+        self.level = 1
+        self.speed = float(engine.INITIAL_SPEED)
+        self.shield = 0
+        self.slow_end = 0       # tick the slow powerup wears off
+        self.alive = False
+        self.respawn_at = 0
+        self.inputs = deque()   # [action, seq] turns not applied yet, one per move
+        self.ack = 0            # newest input seq the arena is done with
+
+class Arena:
+    # Up to MAX_PLAYERS snakes on one board, each playing by engine.py's rules
+    # (advance, collide, eat, level_up), at its own speed. Snakes move at the same
+    # time: heads advance and tails follow first, then whoever shares a cell with
+    # another segment crashes (or uses up its shield), so a head may take the cell
+    # a tail just left and two heads meeting both crash. Crashed snakes respawn.
+    # Everything that changes is appended to records in the PROTOCOL format.
+    pick_item = SnakeEngine.pick_item   # same odds as a one-player game
+
+    def __init__(self, w=ARENA_W, h=ARENA_H, seed=None, rate=TICK_RATE, items=ITEMS, max_rocks=MAX_ROCKS):
+        if w * h > 0xFFFF:
+            raise ValueError("arena too big for u16 cells: %dx%d" % (w, h))
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.grid_w, self.grid_h = w, h
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.rate = rate
+        self.tick = 0
+        self.snakes = {}
+        self.occupied = bytearray(w * h)   # snake segments per cell
+        self.rocks = bytearray(w * h)
+        self.rock_count = 0
+        self.max_rocks = max_rocks
+        # free: cells with no snake, rock or item; rock_cells: the free ones a 30x30 sprite fits in
+        self.free = CellSet(range(w * h))
+        self.rock_cells = CellSet(c for c in range(w * h) if self.fits(c))
+        self.items = [None] * items     # slot -> (kind index, cell)
+        self.item_at = {}               # cell -> slot
+        self.records = []               # changes since the last step()
+        for _ in range(engine.START_OBSTACLES):
+            self.spawn_rock(())
+        for slot in range(items):
+            self.spawn_item(slot)
+
+    def fits(self, c):
+        return c % self.grid_w < self.grid_w - 1 and c // self.grid_w < self.grid_h - 1
+
+    def _block(self, c):
+        self.free.discard(c)
+        self.rock_cells.discard(c)
+
+    def _unblock(self, c):
+        if self.occupied[c] or self.rocks[c] or c in self.item_at:
+            return
+        self.free.add(c)
+        if self.fits(c):
+            self.rock_cells.add(c)
+
+    def status(self, s):
+        self.records.append(REC_STATUS.pack(STATUS, s.id, s.score, s.length, s.shield, s.slow_end,
+                                            DIR_ACTION[s.dx, s.dy], s.speed, s.level))
+
+    # ---------------- PLAYERS ----------------
+    def add_snake(self):
+        # a new snake, spawned at once; None if the room is full
+        sid = next((i for i in range(MAX_PLAYERS) if i not in self.snakes), None)
+        if sid is None:
+            return None
+        s = self.snakes[sid] = ArenaSnake(sid)
+        self.spawn(s)
+        return s
+
+    def remove_snake(self, sid):
+        s = self.snakes.pop(sid, None)
+        if s is None:
+            return
+        self.clear_body(s)
+        self.records.append(REC_ID.pack(LEAVE, sid))
+
+    def push_input(self, sid, action, seq):
+        # queue a turn for the snake's next moves; one that can't apply is dropped
+        s = self.snakes.get(sid)
+        if s is None:
+            return
+        q = s.inputs
+        if s.alive and len(q) < INPUT_QUEUE:
+            ldx, ldy = DIRECTIONS[q[-1][0]] if q else (s.dx, s.dy)
+            if can_turn(action, ldx, ldy):
+                q.append([action, seq])
+                return
+        # dropped: done with it as soon as the turns queued before it are
+        if q:
+            q[-1][1] = seq
+        else:
+            s.ack = seq
+
+    def spawn(self, s):
+        # a free cell with nothing next to it; tries again next tick if none turned up
+        w, occupied, rocks = self.grid_w, self.occupied, self.rocks
+        for _ in range(SPAWN_TRIES if len(self.free) else 0):
+            c = self.free.choice(self.rng)
+            x, y = c % w, c // w
+            if not (0 < x < w-1 and 0 < y < self.grid_h-1):
+                continue
+            if any(occupied[n] or rocks[n] for n in (c-1, c+1, c-w, c+w)):
+                continue
+            s.body = deque([c])
+            occupied[c] = 1
+            self._block(c)
+            s.x, s.y = x, y
+            s.dx, s.dy = 0, 0
+            s.length = s.level = 1
+            s.score = s.shield = s.slow_end = 0
+            s.speed = float(engine.INITIAL_SPEED)
+            s.alive = True
+            self.records.append(REC_CELL.pack(SPAWN, s.id, c))
+            self.status(s)
+            return
+        s.respawn_at = self.tick + 1
+
+    def clear_body(self, s):
+        occupied = self.occupied
+        for c in s.body:
+            occupied[c] -= 1
+            self._unblock(c)
+        s.body.clear()
+        if s.inputs:
+            s.ack = s.inputs[-1][1]
+            s.inputs.clear()
+
+    def kill(self, s):
+        self.clear_body(s)
+        s.alive = False
+        s.respawn_at = self.tick + RESPAWN_TICKS
+        self.records.append(REC_ID.pack(DIE, s.id))
+
+    # ---------------- SPAWNING ----------------
+    def spawn_item(self, slot):
+        kind, size, pts = self.pick_item()
+        pool = self.rock_cells if size > SNAKE_BLOCK and len(self.rock_cells) else self.free
+        if not len(pool):
+            return False
+        c = pool.choice(self.rng)
+        self._block(c)
+        k = KIND_INDEX[kind]
+        self.items[slot] = (k, c)
+        self.item_at[c] = slot
+        self.records.append(REC_ITEM.pack(ITEM, slot, k, c))
+        return True
+
+    def spawn_rock(self, avoid):
+        # one rock, never within one cell of the cells in avoid
+        if self.rock_count >= self.max_rocks or not len(self.rock_cells):
+            return
+        w = self.grid_w
+        for _ in range(SPAWN_TRIES):
+            c = self.rock_cells.choice(self.rng)
+            if any(abs(c % w - a % w) <= 1 and abs(c // w - a // w) <= 1 for a in avoid):
+                continue
+            self._block(c)
+            self.rocks[c] = 1
+            self.rock_count += 1
+            self.records.append(REC_ROCK.pack(ROCK, c))
+            return
+
+    def remove_obstacle(self, x, y):
+        # a shield smashed the rock (engine.advance())
+        c = x + y*self.grid_w
+        self.rocks[c] = 0
+        self.rock_count -= 1
+        self._unblock(c)
+        self.records.append(REC_ROCK.pack(UNROCK, c))
+
+    # ---------------- TICK ----------------
+    def step(self):
+        # advance every snake one tick; returns the records since the last step
+        self.tick += 1
+        tick, w, rate = self.tick, self.grid_w, self.rate
+        occupied, records = self.occupied, self.records
+        moving, crashed = [], []
+
+        # turns, walls and rocks
+        for s in self.snakes.values():
+            if not s.alive:
+                if tick >= s.respawn_at:
+                    self.spawn(s)
+                continue
+            if not moves_on(s, tick, rate):
+                continue
+            if s.inputs:
+                action, s.ack = s.inputs.popleft()
+                if can_turn(action, s.dx, s.dy):
+                    s.dx, s.dy = DIRECTIONS[action]
+            if not (s.dx or s.dy):
+                continue
+            events = []
+            to = engine.advance(s, self, events)
+            if SHIELD_HIT in events:
+                self.status(s)
+            if to is not None:
+                moving.append((s, to[0] + to[1]*w))
+            elif CRASH in events:
+                crashed.append(s)
+
+        # heads in, tails out
+        for s, c in moving:
+            s.x, s.y = c % w, c // w
+            s.body.append(c)
+            occupied[c] += 1
+            self._block(c)
+            if len(s.body) > s.length:
+                t = s.body.popleft()
+                occupied[t] -= 1
+                self._unblock(t)
+                records.append(REC_CELL.pack(MOVE, s.id, c))
+            else:
+                records.append(REC_CELL.pack(GROW, s.id, c))
+
+        # collisions with any snake, itself included
+        for s, c in moving:
+            if occupied[c] > 1:
+                if engine.collide(s, []):
+                    crashed.append(s)
+                else:
+                    self.status(s)
+        for s in crashed:
+            self.kill(s)
+
+        # pickups
+        for s, c in moving:
+            slot = self.item_at.get(c) if s.alive else None
+            if slot is not None:
+                self.eat(s, slot)
+        if len(self.item_at) < len(self.items):
+            for slot, item in enumerate(self.items):
+                if item is None:
+                    self.spawn_item(slot)
+
+        self.records = []
+        return records
+
+    def eat(self, s, slot):
+        k, c = self.items[slot]
+        del self.item_at[c]
+        self.items[slot] = None
+        engine.eat(s, KINDS[k], POINTS.get(k, 0), self.tick, int(engine.SLOW_SECONDS * self.rate))
+        # then as in SnakeEngine: next item, maybe a rock, rocks for a new level
+        if not self.spawn_item(slot):
+            self.records.append(REC_ITEM.pack(ITEM, slot, NO_ITEM, 0))
+        heads = [t.body[-1] for t in self.snakes.values() if t.alive]
+        if self.rng.randint(1,3) == 1:
+            self.spawn_rock(heads)
+        if engine.level_up(s):
+            for _ in range(engine.LEVEL_OBSTACLES):
+                self.spawn_rock(heads)
+        self.status(s)
+
+    def snapshot(self):
+        # records that rebuild the whole room on an empty mirror
+        out = []
+        for s in self.snakes.values():
+            out.append(REC_BODY.pack(BODY, s.id, DIR_ACTION[s.dx, s.dy], len(s.body)))
+            out.append(struct.pack("<%dH" % len(s.body), *s.body))
+            out.append(REC_STATUS.pack(STATUS, s.id, s.score, s.length, s.shield, s.slow_end,
+                                       DIR_ACTION[s.dx, s.dy], s.speed, s.level))
+        for slot, item in enumerate(self.items):
+            if item is not None:
+                out.append(REC_ITEM.pack(ITEM, slot, item[0], item[1]))
+        out.extend(REC_ROCK.pack(ROCK, c) for c in range(self.grid_w * self.grid_h) if self.rocks[c])
+        return out
+
+# ---------------- SERVER ----------------
+class Room:
+    def __init__(self, name, **arena_opts):
+        self.name = name
+        self.arena = Arena(**arena_opts)
+        self.clients = {}   # snake id -> writer, kept up to date with deltas
+        self.fresh = {}     # snake id -> writer, gets a snapshot on the next tick
+        self.sent = 0       # bytes
+
+    def join(self, writer):
+        s = self.arena.add_snake()
+        if s is None:
+            return None
+        self.fresh[s.id] = writer
+        return s.id
+
+    def leave(self, sid, writer):
+        # writer is the connection leaving: once a dropped client's sid has gone
+        # to a new player, the old connection must not take that player out
+        if self.clients.get(sid, self.fresh.get(sid)) is not writer:
+            return
+        self.clients.pop(sid, None)
+        self.fresh.pop(sid, None)
+        self.arena.remove_snake(sid)
+
+    def tick(self):
+        arena = self.arena
+        body = b"".join(arena.step())
+        snakes = arena.snakes
+        slow = []
+        for sid, writer in self.clients.items():
+            if writer.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+                slow.append(sid)
+                continue
+            msg = frame(DELTA_HEAD.pack(DELTA, arena.tick, snakes[sid].ack), body)
+            writer.write(msg)
+            self.sent += len(msg)
+        for sid, writer in self.fresh.items():
+            a = arena
+            msg = frame(SNAP_HEAD.pack(SNAPSHOT, a.tick, snakes[sid].ack, sid, a.grid_w, a.grid_h, a.rate), *a.snapshot())
+            writer.write(msg)
+            self.sent += len(msg)
+            self.clients[sid] = writer
+        self.fresh.clear()
+        for sid in slow:
+            # can't keep up: cut it loose rather than buffer without end
+            writer = self.clients[sid]
+            writer.close()
+            self.leave(sid, writer)
+
+class Server:
+    # every room on one timer; rooms come and go with their players
+    def __init__(self, rate=TICK_RATE, seed=None, **arena_opts):
+        self.rate = rate
+        self.seed = seed    # rooms get seed:name, so a seeded server is repeatable room by room
+        self.arena_opts = dict(arena_opts, rate=rate)
+        self.rooms = {}
+        self.ticks = 0
+        self.busy = 0.0     # seconds spent stepping rooms
+        self.server = self.ticker = None
+        self.port = None
+        self.handlers = set()
+
+    async def start(self, host=HOST, port=PORT):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ticker = asyncio.create_task(self.run())
+
+    async def close(self):
+        self.ticker.cancel()
+        self.server.close()
+        for room in self.rooms.values():
+            for writer in list(room.clients.values()) + list(room.fresh.values()):
+                writer.close()
+        # let the connections wind down instead of cancelling them mid-read
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.rate
+        due = loop.time()
+        while True:
+            due += period
+            now = loop.time()
+            if now - due > MAX_LAG * period:
+                due = now   # stalled (machine asleep?): carry on from here instead of bursting
+            await asyncio.sleep(max(0.0, due - now))
+            t = time.perf_counter()
+            for room in list(self.rooms.values()):
+                room.tick()
+            self.busy += time.perf_counter() - t
+            self.ticks += 1
+
+    async def handle(self, reader, writer):
+        room = sid = None
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        try:
+            data = await read_message(reader, MAX_MESSAGE)
+            if data[0] != JOIN:
+                return
+            name = data[1:].decode("utf-8", "replace") or "lobby"
+            room = self.rooms.get(name)
+            if room is None:
+                seed = None if self.seed is None else "%d:%s" % (self.seed, name)
+                room = self.rooms[name] = Room(name, seed=seed, **self.arena_opts)
+            sid = room.join(writer)
+            if sid is None:
+                return      # full
+            push = room.arena.push_input
+            while True:
+                data = await read_message(reader, MAX_MESSAGE)
+                if data[0] == INPUT and len(data) == INPUT_MSG.size:
+                    _, seq, action = INPUT_MSG.unpack(data)
+                    push(sid, action, seq)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if sid is not None:
+                room.leave(sid, writer)
+                if not room.arena.snakes and self.rooms.get(room.name) is room:
+                    del self.rooms[room.name]
+            writer.close()
+            self.handlers.discard(task)
+
+    def players(self):
+        return sum(len(room.arena.snakes) for room in self.rooms.values())
+
+# ---------------- CLIENT ----------------
+class MirrorSnake:
+    def __init__(self):
+        self.body = deque()
+        self.dx, self.dy = 0, 0
+        self.length = 1
+        self.score = 0
+        self.shield = 0
+        self.slow_end = 0
+        self.speed = float(engine.INITIAL_SPEED)
+        self.level = 1
+        self.alive = False
+
+class Mirror:
+    # a client's copy of its room, rebuilt from a snapshot and kept up by deltas
+    def __init__(self):
+        self.reset(0, 0, TICK_RATE, 0)
+
+    def reset(self, w, h, rate, tick):
+        self.w, self.h, self.rate, self.tick = w, h, rate, tick
+        self.snakes = {}
+        self.items = {}     # slot -> (kind index, cell)
+        self.rocks = set()
+
+    def snake(self, sid):
+        s = self.snakes.get(sid)
+        if s is None:
+            s = self.snakes[sid] = MirrorSnake()
+        return s
+
+    def apply(self, data, i):
+        n, w, snakes = len(data), self.w, self.snakes
+        while i < n:
+            op = data[i]
+            if op == MOVE or op == GROW:
+                _, sid, c = REC_CELL.unpack_from(data, i)
+                i += REC_CELL.size
+                s = snakes[sid]
+                prev = s.body[-1]
+                s.dx, s.dy = c % w - prev % w, c // w - prev // w
+                s.body.append(c)
+                if op == MOVE:
+                    s.body.popleft()
+            elif op == SPAWN:
+                _, sid, c = REC_CELL.unpack_from(data, i)
+                i += REC_CELL.size
+                s = self.snake(sid)
+                s.body = deque([c])
+                s.dx, s.dy = 0, 0
+                s.alive = True
+            elif op == DIE or op == LEAVE:
+                _, sid = REC_ID.unpack_from(data, i)
+                i += REC_ID.size
+                if op == LEAVE:
+                    snakes.pop(sid, None)
+                else:
+                    snakes[sid].body.clear()
+                    snakes[sid].alive = False
+            elif op == STATUS:
+                _, sid, score, length, shield, slow_end, d, speed, level = REC_STATUS.unpack_from(data, i)
+                i += REC_STATUS.size
+                s = snakes[sid]
+                s.score, s.length, s.shield, s.slow_end = score, length, shield, slow_end
+                s.speed, s.level = speed, level
+                s.dx, s.dy = DIRECTIONS.get(d, (0,0))
+            elif op == ITEM:
+                _, slot, kind, c = REC_ITEM.unpack_from(data, i)
+                i += REC_ITEM.size
+                if kind == NO_ITEM:
+                    self.items.pop(slot, None)
+                else:
+                    self.items[slot] = (kind, c)
+            elif op == ROCK or op == UNROCK:
+                _, c = REC_ROCK.unpack_from(data, i)
+                i += REC_ROCK.size
+                if op == ROCK:
+                    self.rocks.add(c)
+                else:
+                    self.rocks.discard(c)
+            elif op == BODY:
+                _, sid, d, count = REC_BODY.unpack_from(data, i)
+                i += REC_BODY.size
+                s = self.snake(sid)
+                s.body = deque(struct.unpack_from("<%dH" % count, data, i))
+                i += 2 * count
+                s.dx, s.dy = DIRECTIONS.get(d, (0,0))
+                s.alive = count > 0
+            else:
+                raise ValueError("unknown record %d at byte %d" % (op, i))
+
+class Client:
+    # one player: a Mirror of its room plus its own snake predicted from unacked turns
+    def __init__(self, room="lobby"):
+        self.room = room
+        self.mirror = Mirror()
+        self.id = None
+        self.seq = 0
+        self.pending = deque()  # (seq, action) sent, not yet done with by the server
+        self.sent_at = {}       # seq -> when it was sent, for the round trip estimate
+        self.rtt = 0.0
+        self.received = 0       # bytes
+        self.last_update = 0.0  # when the newest tick arrived
+        self.reader = self.writer = None
+
+    async def connect(self, host=HOST, port=PORT):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(frame(bytes([JOIN]), self.room.encode("utf-8")))
+
+    async def run(self):
+        # apply messages until the server goes away
+        try:
+            while True:
+                data = await read_message(self.reader)
+                self.received += LENGTH.size + len(data)
+                self.receive(data)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def receive(self, data):
+        m = self.mirror
+        if data[0] == SNAPSHOT:
+            _, tick, ack, self.id, w, h, rate = SNAP_HEAD.unpack_from(data)
+            m.reset(w, h, rate, tick)
+            m.apply(data, SNAP_HEAD.size)
+        elif data[0] == DELTA:
+            _, m.tick, ack = DELTA_HEAD.unpack_from(data)
+            m.apply(data, DELTA_HEAD.size)
+        else:
+            return
+        now = time.perf_counter()
+        self.last_update = now
+        pending = self.pending
+        while pending and pending[0][0] <= ack:
+            sent = self.sent_at.pop(pending.popleft()[0], None)
+            if sent is not None:
+                self.rtt += (now - sent - self.rtt) * 0.2
+        self.on_tick()
+
+    def on_tick(self):
+        pass
+
+    def press(self, action):
+        # send a turn if it is one from where the snake is heading after the pending turns
+        s = self.mirror.snakes.get(self.id)
+        if s is None or not s.alive or len(self.pending) >= INPUT_QUEUE:
+            return False
+        ldx, ldy = DIRECTIONS[self.pending[-1][1]] if self.pending else (s.dx, s.dy)
+        if not can_turn(action, ldx, ldy):
+            return False
+        self.seq += 1
+        self.pending.append((self.seq, action))
+        self.sent_at[self.seq] = time.perf_counter()
+        self.writer.write(frame(INPUT_MSG.pack(INPUT, self.seq, action)))
+        return True
+
+    def lead(self):
+        # how many ticks the server is likely past the newest state here
+        m = self.mirror
+        ahead = (time.perf_counter() - self.last_update + self.rtt / 2) * m.rate
+        return min(MAX_PREDICT, int(ahead))
+
+    def predict(self, ahead=1):
+        # own body `ahead` ticks past the mirror, the pending turns applied one per
+        # move the way Arena.step() will; None while dead
+        m = self.mirror
+        s = m.snakes.get(self.id)
+        if s is None or not s.alive:
+            return None
+        w, h = m.w, m.h
+        body = deque(s.body)
+        dx, dy = s.dx, s.dy
+        turns = deque(a for _, a in self.pending)
+        for tick in range(m.tick + 1, m.tick + 1 + ahead):
+            if not moves_on(s, tick, m.rate):
+                continue
+            if turns:
+                a = turns.popleft()
+                if can_turn(a, dx, dy):
+                    dx, dy = DIRECTIONS[a]
+            if not (dx or dy):
+                continue
+            c = body[-1]
+            x, y = c % w + dx, c // w + dy
+            if not (0 <= x < w and 0 <= y < h):
+                break   # what a wall does is up to the server
+            body.append(x + y*w)
+            if len(body) > s.length:
+                body.popleft()
+        return body
+
+class BotClient(Client):
+    # heads for the nearest item, never into a wall, rock or body cell it can see;
+    # also keeps score of how often the one-tick prediction matched the server
+    def __init__(self, room="lobby", seed=None):
+        super().__init__(room)
+        self.rng = random.Random(seed)
+        self.guess = None
+        self.guesses = self.hits = 0
+
+    def on_tick(self):
+        s = self.mirror.snakes.get(self.id)
+        if s is None or not s.alive:
+            self.guess = None
+            return
+        if self.guess is not None:
+            self.guesses += 1
+            self.hits += s.body[-1] == self.guess
+        if not self.pending:
+            self.press(self.choose(s))
+        body = self.predict(1)
+        self.guess = body[-1] if body else None
+
+    def choose(self, s):
+        m = self.mirror
+        w, h = m.w, m.h
+        blocked = set(m.rocks)
+        for t in m.snakes.values():
+            blocked.update(t.body)
+        head = s.body[-1]
+        hx, hy = head % w, head // w
+        targets = [c for _, c in m.items.values()]
+        best = None
+        for a, (dx, dy) in DIRECTIONS.items():
+            if (dx, dy) != (s.dx, s.dy) and not can_turn(a, s.dx, s.dy):
+                continue
+            x, y = hx + dx, hy + dy
+            if not (0 <= x < w and 0 <= y < h) or x + y*w in blocked:
+                continue
+            d = min((abs(x - c % w) + abs(y - c // w) for c in targets), default=0) + self.rng.random()
+            if best is None or d < best[0]:
+                best = (d, a)
+        return best[1] if best else NOOP
+
+def same_state(mirror, arena):
+    # does a client's mirror match the room it mirrors? (for tests)
+    if mirror.tick != arena.tick or set(mirror.snakes) != set(arena.snakes):
+        return False
+    for sid, s in arena.snakes.items():
+        t = mirror.snakes[sid]
+        if (t.alive, list(t.body), t.length, t.score, t.shield, t.slow_end, t.speed, t.level) != \
+           (s.alive, list(s.body), s.length, s.score, s.shield, s.slow_end, s.speed, s.level):
+            return False
+        if s.alive and (t.dx, t.dy) != (s.dx, s.dy):
+            return False
+    items = {slot: item for slot, item in enumerate(arena.items) if item is not None}
+    rocks = {c for c in range(arena.grid_w * arena.grid_h) if arena.rocks[c]}
+    return mirror.items == items and mirror.rocks == rocks
+
+# ---------------- PYGAME CLIENT ----------------
+SNAKE_COLORS = [(0,200,120), (80,160,255), (255,170,40), (230,80,200), (200,230,60), (60,220,220),
+                (255,110,110), (170,120,255)]
+ITEM_COLORS = {"apple": (213,50,80), "banana": (255,215,0), "berry": (120,60,200), "golden": (255,180,0),
+               "shield": (80,200,255), "slow": (150,150,255)}
+
+async def play(args):
+    import pygame
+    keys = {pygame.K_UP: UP, pygame.K_RIGHT: RIGHT, pygame.K_DOWN: DOWN, pygame.K_LEFT: LEFT}
+    client = Client(args.room)
+    await client.connect(args.host, args.port)
+    reader = asyncio.create_task(client.run())
+    pygame.init()
+    pygame.display.set_caption("Snake - room %s" % args.room)
+    font = pygame.font.SysFont(None, 24)
+    screen = None
+    B = SNAKE_BLOCK
+    try:
+        while not reader.done():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    return 0
+                if event.type == pygame.KEYDOWN and event.key in keys:
+                    client.press(keys[event.key])
+            m = client.mirror
+            if m.w and screen is None:
+                screen = pygame.display.set_mode((m.w * B, m.h * B))
+            if screen is not None:
+                w = m.w
+                screen.fill((20,24,28))
+                for c in m.rocks:
+                    screen.fill((110,110,110), (c % w * B, c // w * B, B, B))
+                for kind, c in m.items.values():
+                    pygame.draw.circle(screen, ITEM_COLORS[KINDS[kind]], (c % w * B + B//2, c // w * B + B//2), B//2 - 2)
+                for sid, s in m.snakes.items():
+                    # others as the server last had them, ours where it is by now
+                    body = client.predict(client.lead()) if sid == client.id else s.body
+                    color = SNAKE_COLORS[sid % len(SNAKE_COLORS)]
+                    for c in body or ():
+                        screen.fill(color, (c % w * B + 1, c // w * B + 1, B - 2, B - 2))
+                me = m.snakes.get(client.id)
+                if me is not None:
+                    text = "Score: %d   players: %d   rtt: %d ms" % (me.score, len(m.snakes), client.rtt * 1000)
+                    screen.blit(font.render(text, True, (255,255,255)), (8, 6))
+                pygame.display.flip()
+            await asyncio.sleep(1 / 60)
+    finally:
+        client.close()
+        pygame.quit()
+    return 0
+
+# ---------------- CLI ----------------
+async def serve(args):
+    server = Server(args.rate, w=args.width, h=args.height)
+    await server.start(args.host, args.port)
+    print("serving on %s:%d at %d ticks/s" % (args.host, server.port, args.rate))
+    ticks, busy = 0, 0.0
+    while True:
+        await asyncio.sleep(5)
+        n = max(1, server.ticks - ticks)
+        print("rooms %d  players %d  %.3f ms/tick" % (len(server.rooms), server.players(),
+                                                     (server.busy - busy) * 1000 / n))
+        ticks, busy = server.ticks, server.busy
+
+async def run_bots(args, port):
+    bots = [BotClient("room%d" % (i % args.rooms), seed=i) for i in range(args.clients)]
+    for bot in bots:
+        await bot.connect(args.host, port)
+    tasks = [asyncio.create_task(bot.run()) for bot in bots]
+    return bots, tasks
+
+def bot_report(bots, seconds):
+    received = sum(b.received for b in bots)
+    guesses = sum(b.guesses for b in bots)
+    print("clients %d  received %.1f KB/s per client  prediction %d/%d right" % (
+        len(bots), received / 1024 / len(bots) / seconds, sum(b.hits for b in bots), guesses))
+
+async def bots(args):
+    bots, tasks = await run_bots(args, args.port)
+    await asyncio.sleep(args.seconds)
+    bot_report(bots, args.seconds)
+    for bot in bots:
+        bot.close()
+    return 0
+
+async def selftest(args):
+    # server and loopback bots in one process; every mirror must match its room at the end
+    server = Server(args.rate, w=args.width, h=args.height, seed=args.seed)
+    await server.start(args.host, 0)
+    bots, tasks = await run_bots(args, server.port)
+    await asyncio.sleep(args.seconds)
+    server.ticker.cancel()
+    await asyncio.sleep(0.5)    # let the last deltas arrive
+    bad = [b for b in bots if b.room not in server.rooms or not same_state(b.mirror, server.rooms[b.room].arena)]
+    ticks = max(1, server.ticks)
+    sent = sum(room.sent for room in server.rooms.values())
+    print("rooms %d  ticks %d  server %.3f ms/tick (%.1f us per room)  %.1f bytes/tick per client" % (
+        len(server.rooms), ticks, server.busy * 1000 / ticks, server.busy * 1e6 / ticks / max(1, len(server.rooms)),
+        sent / ticks / len(bots)))
+    bot_report(bots, args.seconds)
+    print("mirrors out of sync: %d" % len(bad))
+    for bot in bots:
+        bot.close()
+    await server.close()
+    return 1 if bad else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multiplayer Snake over TCP")
+    parser.add_argument("command", choices=["serve", "play", "bots", "selftest"])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--room", default="lobby")
+    parser.add_argument("--rate", type=int, default=TICK_RATE, help="ticks per second")
+    parser.add_argument("--width", type=int, default=ARENA_W)
+    parser.add_argument("--height", type=int, default=ARENA_H)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-n", "--clients", type=int, default=40, help="bot clients")
+    parser.add_argument("--rooms", type=int, default=8, help="rooms the bots spread over")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args(argv)
+    command = {"serve": serve, "play": play, "bots": bots, "selftest": selftest}[args.command]
+    try:
+        return asyncio.run(command(args)) or 0
+    except KeyboardInterrupt:
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
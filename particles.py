@@ -0,0 +1,146 @@
+# particles.py — pickup sparkles stored as parallel arrays
+#
+# One array per field instead of one dict per particle, and the faded circles
+# come from a sprite cache instead of a new Surface per particle. With NumPy
+# installed, ParticleSystem moves, ages and culls all particles as whole-array
+# operations; without it, a per-particle loop over array.array columns does the
+# same work (ArrayParticleSystem), so the game doesn't need NumPy.
+
+import random
+from array import array
+import pygame
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAX_LIFE = 36
+ALPHA_STEPS = 16     # fade is quantized to this many cached sprites per size/color
+
+class ArrayParticleSystem:
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self.x = array("f"); self.y = array("f")
+        self.dx = array("f"); self.dy = array("f")
+        self.life = array("h")
+        self.size = array("B")
+        self.color = array("B")     # index into self.colors
+        self.colors = []
+        self.sprites = {}           # (size, color index, alpha step) -> Surface
+
+    def __len__(self):
+        return len(self.life)
+
+    def clear(self):
+        for a in (self.x, self.y, self.dx, self.dy, self.life, self.size, self.color):
+            del a[:]
+
+    def color_index(self, color):
+        if color not in self.colors:
+            self.colors.append(color)
+        return self.colors.index(color)
+
+    def spawn(self, x, y, color=(255,215,0), count=14):
+        ci = self.color_index(color)
+        rng = self.rng
+        for _ in range(count):
+            self.x.append(x); self.y.append(y)
+            self.dx.append(rng.uniform(-2.5, 2.5))
+            self.dy.append(rng.uniform(-2.5, 2.5))
+            self.life.append(rng.randint(18, MAX_LIFE))
+            self.size.append(rng.randint(2, 5))
+            self.color.append(ci)
+
+    def sprite(self, size, ci, step):
+        key = (size, ci, step)
+        surf = self.sprites.get(key)
+        if surf is None:
+            alpha = 255 * step // (ALPHA_STEPS - 1)
+            surf = pygame.Surface((size*2, size*2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, self.colors[ci] + (alpha,), (size, size), size)
+            self.sprites[key] = surf
+        return surf
+
+    def update(self, surface, steps=1, offset=(0,0)):
+        # advance every particle by `steps` frames (0 just redraws), drop the dead ones,
+        # draw the rest in one blits() call, shifted by -offset; returns the rects drawn
+        X, Y, DX, DY = self.x, self.y, self.dx, self.dy
+        L, S, C = self.life, self.size, self.color
+        sprite = self.sprite
+        ox, oy = offset
+        blits = []
+        w = 0
+        for i in range(len(L)):
+            life = L[i] - steps
+            if life <= 0:
+                continue
+            x = X[i] + DX[i]*steps; y = Y[i] + DY[i]*steps
+            s = S[i]
+            X[w] = x; Y[w] = y; DX[w] = DX[i]; DY[w] = DY[i]
+            L[w] = life; S[w] = s; C[w] = C[i]
+            step = life * (ALPHA_STEPS - 1) // MAX_LIFE
+            blits.append((sprite(s, C[i], step), (int(x - s - ox), int(y - s - oy))))
+            w += 1
+        for a in (X, Y, DX, DY, L, S, C):
+            del a[w:]
+        if not blits:
+            return []
+        return surface.blits(blits)
+
+class NumpyParticleSystem(ArrayParticleSystem):
+    # the same particles as NumPy columns: one update is a handful of array
+    # operations whatever the count, plus the blits() call that draws them
+    def __init__(self, rng=None):
+        super().__init__(rng)
+        self.by_key = {}    # size << 16 | color << 8 | alpha step -> Surface
+        self.clear()
+
+    def clear(self):
+        self.x = np.empty(0); self.y = np.empty(0)
+        self.dx = np.empty(0); self.dy = np.empty(0)
+        self.life = np.empty(0, np.int32)
+        self.size = np.empty(0, np.int32)
+        self.color = np.empty(0, np.int32)
+
+    def spawn(self, x, y, color=(255,215,0), count=14):
+        ci = self.color_index(color)
+        if count <= 0:
+            return
+        rng = self.rng
+        new = []
+        for _ in range(count):  # same draws in the same order as ArrayParticleSystem
+            new.append((rng.uniform(-2.5, 2.5), rng.uniform(-2.5, 2.5), rng.randint(18, MAX_LIFE), rng.randint(2, 5)))
+        dx, dy, life, size = zip(*new)
+        cat = np.concatenate
+        self.x = cat((self.x, np.full(count, float(x)))); self.y = cat((self.y, np.full(count, float(y))))
+        self.dx = cat((self.dx, dx)); self.dy = cat((self.dy, dy))
+        self.life = cat((self.life, np.array(life, np.int32)))
+        self.size = cat((self.size, np.array(size, np.int32)))
+        self.color = cat((self.color, np.full(count, ci, np.int32)))
+
+    def update(self, surface, steps=1, offset=(0,0)):
+        # same contract as ArrayParticleSystem.update()
+        if not len(self.life):
+            return []
+        if steps:
+            life = self.life - steps
+            keep = life > 0
+            if not keep.all():
+                self.x, self.y, self.dx, self.dy, self.size, self.color = (
+                    a[keep] for a in (self.x, self.y, self.dx, self.dy, self.size, self.color))
+                life = life[keep]
+            self.life = life
+            self.x += self.dx * steps
+            self.y += self.dy * steps
+        if not len(self.life):
+            return []
+        s = self.size
+        px = (self.x - s - offset[0]).astype(np.int64).tolist()    # truncates like int()
+        py = (self.y - s - offset[1]).astype(np.int64).tolist()
+        keys = (s << 16 | self.color << 8 | self.life * (ALPHA_STEPS - 1) // MAX_LIFE).tolist()
+        table = self.by_key
+        for k in set(keys).difference(table):
+            table[k] = self.sprite(k >> 16, k >> 8 & 255, k & 255)
+        return surface.blits(list(zip(map(table.__getitem__, keys), zip(px, py))))
+
+ParticleSystem = NumpyParticleSystem if np is not None else ArrayParticleSystem
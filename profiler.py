@@ -0,0 +1,121 @@
+# profiler.py — per-phase frame timings kept in fixed-size ring buffers
+#
+# game_loop() calls start() at the top of every frame, mark(phase) after
+# each piece of work and commit() once a gameplay frame is on screen; frames
+# that are never committed (pause, game over) are dropped. Each phase keeps
+# the last `size` frames, so percentiles always describe the last few
+# seconds and memory never grows.
+#
+# A frame's total is its busy time: everything but "idle", the clock.tick()
+# sleep at the top of the frame, so a frame that keeps up with the frame rate
+# is never reported as a spike however long it waited.
+#
+# In game: F3 shows the overlay, F4 writes the samples to a JSON file.
+
+import json, time
+from array import array
+import pygame
+
+PHASES = ("idle", "events", "update", "obstacles", "draw_snake", "hud", "particles", "display")
+
+class FrameProfiler:
+    def __init__(self, size=600, phases=PHASES, clock=time.perf_counter):
+        self.size = size
+        self.phases = phases
+        self.clock = clock
+        self.samples = {p: array("d", bytes(8 * size)) for p in phases}   # seconds
+        self.total = array("d", bytes(8 * size))     # busy seconds (all phases but idle)
+        self.index = 0      # next slot to write
+        self.count = 0      # filled slots (<= size)
+        self.current = dict.fromkeys(phases, 0.0)
+        self.last = self.started = clock()
+
+    def start(self):
+        cur = self.current
+        for p in cur:
+            cur[p] = 0.0
+        self.last = self.started = self.clock()
+
+    def mark(self, phase):
+        # charge the time since the previous mark to phase
+        t = self.clock()
+        self.current[phase] += t - self.last
+        self.last = t
+
+    def commit(self):
+        i = self.index
+        for p, v in self.current.items():
+            self.samples[p][i] = v
+        self.total[i] = self.last - self.started - self.current.get("idle", 0.0)
+        self.index = (i + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def ordered(self, buf):
+        # samples oldest -> newest
+        if self.count < self.size:
+            return list(buf[:self.count])
+        return list(buf[self.index:]) + list(buf[:self.index])
+
+    def stats(self, phase=None):
+        # (p50, p99, max) in seconds for a phase, or for whole frames' busy time if phase is None
+        buf = self.total if phase is None else self.samples[phase]
+        data = sorted(buf[:self.count])
+        if not data:
+            return (0.0, 0.0, 0.0)
+        n = len(data)
+        return (data[n // 2], data[min(n - 1, n * 99 // 100)], data[-1])
+
+    def spikes(self, budget):
+        # frames busy for over budget seconds, and the phase that took longest in the worst one
+        over = [i for i in range(self.count) if self.total[i] > budget]
+        if not over:
+            return 0, None, 0.0
+        worst = max(over, key=lambda i: self.total[i])
+        phase = max((p for p in self.phases if p != "idle"), key=lambda p: self.samples[p][worst])
+        return len(over), phase, self.total[worst]
+
+    def dump(self, path):
+        data = {
+            "unit": "ms",
+            "frames": self.count,
+            "total": [v * 1000 for v in self.ordered(self.total)],
+            "phases": {p: [v * 1000 for v in self.ordered(self.samples[p])] for p in self.phases},
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+class ProfilerOverlay:
+    # text panel with p50/p99/max per phase; re-rendered a few times a second, not every frame
+    def __init__(self, profiler, font, budget, refresh=0.5):
+        self.profiler = profiler
+        self.font = font
+        self.budget = budget
+        self.refresh = refresh
+        self.surface = None
+        self.updated = -refresh
+
+    def render(self, now):
+        if self.surface is not None and now - self.updated < self.refresh:
+            return self.surface
+        self.updated = now
+        prof = self.profiler
+        lines = ["%-10s %6s %6s %6s" % ("ms", "p50", "p99", "max")]
+        for p in prof.phases + (None,):
+            p50, p99, worst = prof.stats(p)
+            lines.append("%-10s %6.2f %6.2f %6.2f" % (p or "busy", p50*1000, p99*1000, worst*1000))
+        n, phase, worst = prof.spikes(self.budget)
+        lines.append("spikes >%.1fms: %d/%d" % (self.budget*1000, n, prof.count))
+        if n:
+            lines.append("worst %.1fms in %s" % (worst*1000, phase))
+        rows = [self.font.render(l, True, (255,255,255)) for l in lines]
+        w = max(r.get_width() for r in rows) + 12
+        h = sum(r.get_height() for r in rows) + 12
+        surf = pygame.Surface((w, h), pygame.SRCALPHA)
+        surf.fill((0,0,0,170))
+        y = 6
+        for r in rows:
+            surf.blit(r, (6, y))
+            y += r.get_height()
+        self.surface = surf
+        return surf
@@ -0,0 +1,49 @@
+# render_cache.py — bounded caches for rendered text and scaled images
+#
+# Font rasterization and transform.scale are some of the most expensive calls
+# in a frame, and most frames ask for exactly the same surfaces as the last
+# one. Entries are keyed by their inputs, so a new score simply misses and the
+# oldest unused surface falls out once the cache is full.
+#
+# Cached surfaces are shared: copy() one before calling set_alpha() on it.
+
+from collections import OrderedDict
+import pygame
+
+class LRUCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, make):
+        # return the cached value for key, building it with make() on a miss
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            value = self.data[key] = make()
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+            return value
+        self.hits += 1
+        self.data.move_to_end(key)
+        return value
+
+    def clear(self):
+        self.data.clear()
+
+text_cache = LRUCache(256)
+image_cache = LRUCache(64)
+
+def render_text(font, text, color, antialias=True):
+    return text_cache.get((font, text, color, antialias),
+                          lambda: font.render(text, antialias, color))
+
+def scaled(image, size):
+    return image_cache.get((image, size),
+                           lambda: pygame.transform.scale(image, size))
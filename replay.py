@@ -0,0 +1,103 @@
+# replay.py — record games as seed + one action byte per tick, and play them back
+#
+# The engine is deterministic given its seed and the action of every tick, so
+# that is all a replay stores. Playing one back headless re-runs the rules as
+# fast as Python allows, which is how recorded scores are checked:
+#
+#     python replay.py verify replays/*.replay
+#
+# To watch one instead: python snake.py --replay FILE
+#
+# File layout (little endian): magic "SNKR", version (u8), seed (u64),
+# ticks (u32), final score (u32), final level (u8), then `ticks` action bytes
+# (engine.NOOP/UP/RIGHT/DOWN/LEFT).
+
+import os, struct, sys, time
+import engine
+
+MAGIC = b"SNKR"
+VERSION = 1
+HEADER = struct.Struct("<4sBQIIB")
+
+class Replay:
+    def __init__(self, seed, actions=b"", score=0, level=1):
+        self.seed = seed
+        self.actions = bytearray(actions)
+        self.score = score      # result the recording claims
+        self.level = level
+
+    def __len__(self):
+        return len(self.actions)
+
+    def record(self, action):
+        self.actions.append(action)
+
+    def finish(self, game):
+        self.score, self.level = game.score, game.level
+
+    def action(self, tick):
+        # action for a tick (0-based); NOOP past the end of the recording
+        return self.actions[tick] if tick < len(self.actions) else engine.NOOP
+
+    def to_bytes(self):
+        return HEADER.pack(MAGIC, VERSION, self.seed & (2**64-1), len(self.actions),
+                           self.score, self.level) + bytes(self.actions)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, ticks, score, level = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a version %d replay" % VERSION)
+        actions = data[HEADER.size:HEADER.size + ticks]
+        if len(actions) != ticks:
+            raise ValueError("replay is truncated")
+        return cls(seed, actions, score, level)
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+def play(replay, game=None):
+    # run the whole replay headless; returns the engine in its final state
+    game = game or engine.SnakeEngine()
+    game.reset(replay.seed)
+    step = game.step
+    for action in replay.actions:
+        step(action)
+        if game.done:
+            break
+    return game
+
+def verify(replay, game=None):
+    # True if re-running the replay ends the game with the recorded result on its last tick
+    game = play(replay, game)
+    return (game.done and game.ticks == len(replay)
+            and game.score == replay.score and game.level == replay.level)
+
+def main(args):
+    if len(args) < 2 or args[0] != "verify":
+        sys.exit("usage: python replay.py verify FILE...")
+    game = engine.SnakeEngine()
+    bad = ticks = 0
+    start = time.perf_counter()
+    for path in args[1:]:
+        replay = Replay.load(path)
+        ok = verify(replay, game)
+        ticks += game.ticks
+        if not ok:
+            bad += 1
+            print("MISMATCH %s: recorded score %d level %d, replayed score %d level %d after %d/%d ticks"
+                  % (path, replay.score, replay.level, game.score, game.level, game.ticks, len(replay)))
+    took = time.perf_counter() - start
+    print("%d replays, %d mismatches, %d ticks in %.2fs" % (len(args) - 1, bad, ticks, took))
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
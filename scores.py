@@ -0,0 +1,160 @@
+# scores.py — high score file and SQLite leaderboard, written off the game thread
+#
+# Everything that touches the disk after startup goes through a single
+# background worker, so dying never waits on a write. The high score file is
+# replaced atomically (write a temp file, fsync, os.replace), so a crash
+# mid-write leaves the old score instead of a corrupt file. Every finished
+# run is also stored in scores.db:
+#
+#     python scores.py            # print the top 10 runs
+
+import atexit, os, queue, sqlite3, sys, threading, time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    ticks INTEGER NOT NULL,
+    seed TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC);
+"""
+
+def warn(msg, err):
+    print("scores: %s: %s" % (msg, err), file=sys.stderr)
+
+def atomic_write(path, text):
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def read_int(path):
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        warn("could not read %s" % path, e)
+        return None
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def top_runs(db_path, n=10):
+    # (score, level, length, duration, finished_at) best first
+    conn = connect(db_path)
+    try:
+        return conn.execute("SELECT score, level, length, duration, finished_at FROM runs "
+                            "ORDER BY score DESC, duration ASC LIMIT ?", (n,)).fetchall()
+    finally:
+        conn.close()
+
+class ScoreStore:
+    def __init__(self, highscore_path, db_path):
+        self.highscore_path = highscore_path
+        self.db_path = db_path
+        self.highscore = None       # read on first load()
+        self.saved_highscore = 0
+        self.jobs = queue.Queue()
+        self.worker = None
+        self.conn = None            # owned by the worker thread
+
+    def load(self):
+        # the high score; the file is read (synchronously, once) on the first call
+        if self.highscore is None:
+            self.highscore = self.saved_highscore = read_int(self.highscore_path) or 0
+        return self.highscore
+
+    def start(self):
+        if self.worker is None:
+            self.conn = None
+            self.jobs.put(self.open_db)     # always the worker's first job
+            self.worker = threading.Thread(target=self.run, name="scores", daemon=True)
+            self.worker.start()
+            # sys.exit() runs atexit handlers: finish pending writes before the process goes
+            atexit.register(self.close)
+        return self
+
+    def open_db(self):
+        try:
+            self.conn = connect(self.db_path)
+        except sqlite3.Error as e:
+            warn("leaderboard disabled, could not open %s" % self.db_path, e)
+            return
+        best = self.conn.execute("SELECT MAX(score) FROM runs").fetchone()[0]
+        if best and best > self.load():
+            # highscore.txt lost or corrupt: recover it from the leaderboard
+            self.highscore = best
+            self.write_highscore(best)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    break
+                job()
+            except (OSError, sqlite3.Error) as e:
+                warn("write failed", e)
+            except Exception as e:
+                # a bad job must not kill the worker: flush() would wait on it forever
+                warn("job failed", "%s: %s" % (type(e).__name__, e))
+            finally:
+                self.jobs.task_done()
+        if self.conn is not None:
+            self.conn.close()
+
+    def submit(self, job):
+        self.start()
+        self.jobs.put(job)
+
+    def write_highscore(self, value):
+        # worker side; writes can queue up, so never let an older, lower one land last
+        if value > self.saved_highscore:
+            atomic_write(self.highscore_path, str(value))
+            self.saved_highscore = value
+
+    def save_highscore(self, value):
+        value = int(value)
+        if value > self.load():
+            self.highscore = value
+        self.submit(lambda: self.write_highscore(value))
+
+    def record_run(self, score, level, length, duration, ticks, seed=None):
+        row = (time.time(), int(score), int(level), int(length), float(duration), int(ticks),
+               None if seed is None else str(seed))
+        def job():
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.execute("INSERT INTO runs (finished_at, score, level, length, duration, ticks, seed) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+        self.submit(job)
+
+    def flush(self):
+        # wait until everything queued so far is on disk
+        if self.worker is not None:
+            self.jobs.join()
+
+    def close(self):
+        if self.worker is not None and self.worker.is_alive():
+            self.jobs.put(None)
+            self.worker.join()
+
+if __name__ == "__main__":
+    base = os.path.dirname(os.path.abspath(__file__))
+    db = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base, "scores.db")
+    print("%5s %6s %6s %7s %9s  %s" % ("rank", "score", "level", "length", "duration", "finished"))
+    for i, (score, level, length, duration, finished) in enumerate(top_runs(db), 1):
+        print("%5d %6d %6d %7d %8.1fs  %s" % (i, score, level, length, duration,
+                                              time.strftime("%Y-%m-%d %H:%M", time.localtime(finished))))
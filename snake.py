@@ -1,21 +1,43 @@
 # snake.py — Full Snake Game 
 
-import math
-import pygame, random, os, time, sys
-pygame.init()
-try:
-    pygame.mixer.init()
-except:
-    pass
+import pygame, os, sys, time
+import engine
+from engine import WIDTH, HEIGHT, SNAKE_BLOCK
+from particles import ParticleSystem
+from render_cache import render_text, scaled
+from dirty_rects import DirtyRects
+from static_layer import StaticLayer
+from snake_sprites import SnakeAtlas, GRADIENT_STEPS, WAVE, WAVE_STEPS, WAVE_SCALE, WAVE_REACH
+from assets import Assets, LazyFont, LazySound
+from replay import Replay
+from profiler import FrameProfiler, ProfilerOverlay
+from scores import ScoreStore
+from autopilot import Autopilot
+from world import WorldEngine, Camera
 
 # ---------------- CONFIG ----------------
-WIDTH, HEIGHT = 800, 600
-SNAKE_BLOCK = 20
-INITIAL_SPEED = 6.0
-FPS_MIN = 5
-
 BASE_DIR = os.path.dirname(__file__) if "__file__" in globals() else os.getcwd()
 HIGHSCORE_FILE = os.path.join(BASE_DIR, "highscore.txt")
+SCORES_DB = os.path.join(BASE_DIR, "scores.db")     # leaderboard of every run (see scores.py)
+# SNAKE_DIRTY_RECTS=1 redraws and flips only the changed parts of the screen
+# (much cheaper on slow machines / big windows)
+DIRTY_RECTS = os.environ.get("SNAKE_DIRTY_RECTS") == "1"
+# SNAKE_REPLAY_DIR=path saves every finished game there (see replay.py)
+REPLAY_DIR = os.environ.get("SNAKE_REPLAY_DIR")
+# F3 shows per-phase frame timings, F4 writes them to PROFILE_FILE;
+# SNAKE_PROFILE_DUMP=path also writes them whenever a game ends
+PROFILE_DUMP = os.environ.get("SNAKE_PROFILE_DUMP")
+PROFILE_FILE = PROFILE_DUMP or os.path.join(BASE_DIR, "profile.json")
+# SNAKE_WORLD=WxH (cells, e.g. 10000x10000) plays in a big world that scrolls with the head (see world.py)
+WORLD = os.environ.get("SNAKE_WORLD")
+WORLD_SIZE = tuple(int(v) for v in WORLD.lower().split("x")) if WORLD else None
+
+RENDER_FPS = 60         # frames drawn per second; the game itself runs at its own tick rate
+PARTICLE_RATE = 20      # particle animation steps per second
+LEVEL_UP_SECONDS = 0.7
+FADE_SECONDS = 0.4
+ATTRACT_SECONDS = 20    # idle time on the main menu before the autopilot demo starts
+DEMO_OVER_SECONDS = 3   # how long a finished demo game shows GAME OVER
 
 # Colors
 WHITE = (255,255,255)
@@ -24,217 +46,145 @@ YELLOW = (255,215,0)
 GREEN_HEAD = (0,200,120)
 BLACK = (0,0,0)
 
+# ---------------- ASSETS ----------------
+# everything is loaded on first use (see assets.py; `python assets.py build` for a fast-start pack)
+assets = Assets()
+
 # Fonts
-TITLE_FONT = pygame.font.SysFont("comicsansms", 60, bold=True)
-BIG_FONT = pygame.font.SysFont("comicsansms", 50, bold=True)
-SCORE_FONT = pygame.font.SysFont("comicsansms", 28)
-UI_FONT = pygame.font.SysFont("bahnschrift", 22)
-
-# Pygame setup
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Snake Game Deluxe")
+TITLE_FONT = LazyFont(assets, "title")
+BIG_FONT = LazyFont(assets, "big")
+SCORE_FONT = LazyFont(assets, "score")
+UI_FONT = LazyFont(assets, "ui")
+MONO_FONT = LazyFont(assets, "mono")
+
+chomp_sound = LazySound(assets, "chomp")
+crash_sound = LazySound(assets, "crash")
+levelup_sound = LazySound(assets, "levelup")
+
+scores = ScoreStore(HIGHSCORE_FILE, SCORES_DB)
+
+# Pygame setup (init_display() opens the window)
+screen = None
 clock = pygame.time.Clock()
 
-# ---------------- SAFE LOADERS ----------------
-def safe_load_image(name, fallback_size=(40,40), col=(120,120,120)):
-    path = os.path.join(BASE_DIR, name)
+def init_display():
+    global screen
+    pygame.init()
     try:
-        img = pygame.image.load(path).convert_alpha()
-        return img
-    except Exception:
-        surf = pygame.Surface(fallback_size, pygame.SRCALPHA)
-        surf.fill(col)
-        return surf
+        pygame.mixer.init()
+    except:
+        pass
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Snake Game Deluxe")
+    return screen
+
+music_started = False
 
-def safe_load_sound(name):
-    path = os.path.join(BASE_DIR, name)
+def start_music():
+    global music_started
+    music_started = True
     try:
-        return pygame.mixer.Sound(path)
+        pygame.mixer.music.load(os.path.join(BASE_DIR, "background_music.mp3"))
+        pygame.mixer.music.play(-1)  # -1 means loop forever
     except Exception:
-        class _D:
-            def play(self, *a, **k): pass
-        return _D()
-
-# ---------------- ASSETS (filenames from your folder) ----------------
-backgrounds = {
-    1: pygame.transform.scale(safe_load_image("background_forest.jpg"), (WIDTH, HEIGHT)),
-    2: pygame.transform.scale(safe_load_image("background_desert.jpg"), (WIDTH, HEIGHT)),
-    3: pygame.transform.scale(safe_load_image("background_space.jpg"), (WIDTH, HEIGHT)),
-}
-menu_background = pygame.transform.scale(safe_load_image("menu_background.jpg"), (WIDTH, HEIGHT))
-
-apple_img = safe_load_image("apple.png")
-banana_img = safe_load_image("banana.png")
-berry_img = safe_load_image("berry.png")
-golden_img = safe_load_image("golden_apple.png")
-rock_img = pygame.transform.scale(safe_load_image("rock.png"), (30,30))
-shield_img = pygame.transform.scale(safe_load_image("shield.png"), (25,25))
-slow_img = pygame.transform.scale(safe_load_image("slow.png"), (25,25))
-
-chomp_sound = safe_load_sound("chomp.wav")
-crash_sound = safe_load_sound("crash.wav")
-levelup_sound = safe_load_sound("levelup.wav")
-
-# FRUITS: (image, display_size, points)
-FRUITS = [
-    (apple_img, 20, 10),
-    (banana_img, 25, 20),
-    (berry_img, 18, 30),
-    (golden_img, 30, 50),
-]
+        pass
 
 # ---------------- HELPERS ----------------
 def read_highscore():
-    try:
-        with open(HIGHSCORE_FILE, "r") as f:
-            return int(f.read().strip())
-    except:
-        return 0
+    return scores.load()
 
 def save_highscore(v):
-    try:
-        with open(HIGHSCORE_FILE, "w") as f:
-            f.write(str(int(v)))
-    except:
-        pass
+    # queued: the write happens on the scores worker thread
+    scores.save_highscore(v)
 
 def blit_centered_text(text, font, color, y):
-    surf = font.render(text, True, color)
+    surf = render_text(font, text, color)
     screen.blit(surf, (WIDTH//2 - surf.get_width()//2, y))
 
-def spawn_fruit_or_power():
-    # 12% chance for powerup (shield or slow), else a fruit
-    if random.random() < 0.12:
-        if random.random() < 0.5:
-            size = 25
-            fx = random.randint(0, (WIDTH - size)//SNAKE_BLOCK) * SNAKE_BLOCK
-            fy = random.randint(0, (HEIGHT - size)//SNAKE_BLOCK) * SNAKE_BLOCK
-            return ("shield", fx, fy, shield_img, size, 0, "shield")
-        else:
-            size = 25
-            fx = random.randint(0, (WIDTH - size)//SNAKE_BLOCK) * SNAKE_BLOCK
-            fy = random.randint(0, (HEIGHT - size)//SNAKE_BLOCK) * SNAKE_BLOCK
-            return ("slow", fx, fy, slow_img, size, 0, "slow")
-    else:
-        img, size, pts = random.choice(FRUITS)
-        fx = random.randint(0, (WIDTH - size)//SNAKE_BLOCK) * SNAKE_BLOCK
-        fy = random.randint(0, (HEIGHT - size)//SNAKE_BLOCK) * SNAKE_BLOCK
-        return ("fruit", fx, fy, img, size, pts, None)
-
-def spawn_obstacles(n, avoid_positions=None):
-    avoid_positions = avoid_positions or []
-    obs = []
-    tries = 0
-    while len(obs) < n and tries < n*15:
-        ox = random.randint(0, (WIDTH-30)//SNAKE_BLOCK) * SNAKE_BLOCK
-        oy = random.randint(0, (HEIGHT-30)//SNAKE_BLOCK) * SNAKE_BLOCK
-        ok = True
-        for (ax,ay) in avoid_positions:
-            if abs(ax-ox) < SNAKE_BLOCK*2 and abs(ay-oy) < SNAKE_BLOCK*2:
-                ok = False; break
-        if ok and (ox,oy) not in obs:
-            obs.append((ox,oy))
-        tries += 1
-    return obs
-
 # ---------------- PARTICLES ----------------
-particles = []
+particles = ParticleSystem()
 def spawn_particles(x, y, color=(255,215,0)):
-    for _ in range(14):
-        particles.append({
-            "x": x + SNAKE_BLOCK//2,
-            "y": y + SNAKE_BLOCK//2,
-            "dx": random.uniform(-2.5, 2.5),
-            "dy": random.uniform(-2.5, 2.5),
-            "life": random.randint(18,36),
-            "size": random.randint(2,5),
-            "color": color
-        })
-
-def update_particles():
-    for p in particles[:]:
-        p["x"] += p["dx"]; p["y"] += p["dy"]; p["life"] -= 1
-        alpha = int(255 * (p["life"]/36)) if p["life"]>0 else 0
-        surf = pygame.Surface((p["size"]*2, p["size"]*2), pygame.SRCALPHA)
-        c = p["color"] + (alpha,)
-        pygame.draw.circle(surf, c, (p["size"], p["size"]), p["size"])
-        screen.blit(surf, (int(p["x"]-p["size"]), int(p["y"]-p["size"])))
-        if p["life"] <= 0:
-            particles.remove(p)
+    particles.spawn(x + SNAKE_BLOCK//2, y + SNAKE_BLOCK//2, color)
+
+def update_particles(steps=1, offset=(0,0)):
+    # returns the rects drawn this frame; offset is the camera position in a big world
+    return particles.update(screen, steps, offset)
 
 # ---------------- SNAKE DRAW (real snake look) ----------------
-def draw_snake(snake_list, head_dir=(0,0), shield_strength=0):
+snake_atlas = None
+
+def draw_snake(snake_list, head_dir=(0,0), shield_strength=0, offset=None):
+    # returns the screen rects it drew over (used by the dirty-rect renderer).
+    # offset: camera position in a big world; segments off screen are skipped
+    global snake_atlas
+    if snake_atlas is None:
+        snake_atlas = SnakeAtlas()
+    body = snake_atlas.body
     length = len(snake_list)
-    for i, (sx, sy) in enumerate(snake_list):
-        cx, cy = sx + SNAKE_BLOCK//2, sy + SNAKE_BLOCK//2
-        ratio = i / max(1, length-1)
-
-        # Gradient color: bright green at head, darker green tail
-        g = int(200 - ratio*120)
-        r = int(30 + ratio*50)
-        b = int(30 + ratio*20)
-        color = (r, g, b)
-
-        # Make snake body slightly wavy (sin curve)
-        wave_offset = int(3 * math.sin(pygame.time.get_ticks()/150 + i))
-        if i != length - 1:  # body segment
-            pygame.draw.circle(screen, color, (cx+wave_offset, cy), SNAKE_BLOCK//2)
-        else:
-            # HEAD (bigger, with eyes & tongue)
-            pygame.draw.circle(screen, color, (cx, cy), SNAKE_BLOCK//2 + 2)
-
-            # Eyes based on head_dir
-            eye_offset = 6
-            if head_dir[0] != 0:   # moving horizontally
-                eye_y = cy - 4
-                pygame.draw.circle(screen, WHITE, (cx - eye_offset, eye_y), 3)
-                pygame.draw.circle(screen, WHITE, (cx + eye_offset, eye_y), 3)
-                pygame.draw.circle(screen, BLACK, (cx - eye_offset, eye_y), 1)
-                pygame.draw.circle(screen, BLACK, (cx + eye_offset, eye_y), 1)
-            else:   # moving vertically
-                eye_x = cx - 4
-                pygame.draw.circle(screen, WHITE, (eye_x, cy - eye_offset), 3)
-                pygame.draw.circle(screen, WHITE, (eye_x+8, cy - eye_offset), 3)
-                pygame.draw.circle(screen, BLACK, (eye_x, cy - eye_offset), 1)
-                pygame.draw.circle(screen, BLACK, (eye_x+8, cy - eye_offset), 1)
-
-            # Tongue (red fork)
-            if head_dir != (0,0):
-                tongue_len = 12
-                tx, ty = cx + head_dir[0]*tongue_len, cy + head_dir[1]*tongue_len
-                pygame.draw.line(screen, (220,30,30), (cx, cy), (tx, ty), 2)
-                # fork
-                if head_dir[0] != 0:  # left/right fork
-                    pygame.draw.line(screen, (220,30,30), (tx, ty), (tx, ty-4), 2)
-                    pygame.draw.line(screen, (220,30,30), (tx, ty), (tx, ty+4), 2)
-                else:  # up/down fork
-                    pygame.draw.line(screen, (220,30,30), (tx, ty), (tx-4, ty), 2)
-                    pygame.draw.line(screen, (220,30,30), (tx, ty), (tx+4, ty), 2)
-
-            # Shield bubble
-            if shield_strength > 0:
-                bubble = pygame.Surface((SNAKE_BLOCK*3, SNAKE_BLOCK*3), pygame.SRCALPHA)
-                pygame.draw.circle(bubble, (0,200,255,90),
-                                   (SNAKE_BLOCK*3//2, SNAKE_BLOCK*3//2),
-                                   SNAKE_BLOCK+8)
-                screen.blit(bubble, (sx - SNAKE_BLOCK, sy - SNAKE_BLOCK))
+    if not length:
+        return []
+    last = max(1, length-1)
+    steps = GRADIENT_STEPS - 1
+
+    # Make snake body slightly wavy (sin curve, from the lookup table)
+    phase = pygame.time.get_ticks()/150 * WAVE_SCALE
+    blits = []
+    if offset is None:
+        for i in range(length - 1):
+            sx, sy = snake_list[i]
+            wave_offset = WAVE[int(phase + i*WAVE_SCALE) % WAVE_STEPS]
+            blits.append((body[i*steps//last], (sx + wave_offset, sy)))
+        sx, sy = snake_list[-1]
+    else:
+        ox, oy = offset
+        B, R = SNAKE_BLOCK, WAVE_REACH
+        for i in range(length - 1):
+            sx, sy = snake_list[i]
+            sx -= ox; sy -= oy
+            # a segment covers sx..sx+B (give or take the wave) and sy..sy+B
+            if -B - R < sx < WIDTH + R and -B < sy < HEIGHT:
+                wave_offset = WAVE[int(phase + i*WAVE_SCALE) % WAVE_STEPS]
+                blits.append((body[i*steps//last], (sx + wave_offset, sy)))
+        sx, sy = snake_list[-1]
+        sx -= ox; sy -= oy
+
+    # HEAD (bigger, with eyes & tongue) plus the shield bubble, centered on the head cell
+    pos = (sx - SNAKE_BLOCK, sy - SNAKE_BLOCK)
+    blits.append((snake_atlas.head(head_dir, (length-1)*steps//last), pos))
+    if shield_strength > 0:
+        blits.append((snake_atlas.bubble, pos))
+    return screen.blits(blits)
 
 # ---------------- MENUS / SCREENS ----------------
 sound_enabled = True
 
+def demo():
+    # autopilot games until a key is pressed (attract mode, and `snake.py --demo` for soak tests)
+    pilot = Autopilot()
+    while not game_loop(pilot=pilot):
+        pass
+
 def main_menu():
+    idle = 0.0
     while True:
-        screen.blit(menu_background, (0,0))
+        screen.blit(assets.image("menu_background"), (0,0))
         blit_centered_text("SNAKE GAME", TITLE_FONT, RED, HEIGHT//6)
         blit_centered_text("ENTER - Start    I - Instructions    Q - Quit", UI_FONT, WHITE, HEIGHT//2)
         pygame.display.update()
+        # load the music only once the menu is on screen
+        if not music_started: start_music()
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT: pygame.quit(); sys.exit()
             if ev.type == pygame.KEYDOWN:
+                idle = 0.0
                 if ev.key == pygame.K_RETURN: return
                 if ev.key == pygame.K_q: pygame.quit(); sys.exit()
                 if ev.key == pygame.K_i: instructions()
                 if ev.key == pygame.K_s: settings_menu()
+        idle += clock.tick(30) / 1000.0
+        if idle >= ATTRACT_SECONDS:
+            demo()
+            idle = 0.0
 
 def instructions():
     showing = True
@@ -250,21 +200,22 @@ def instructions():
             "Press ESC to return."
         ]
         for i, l in enumerate(lines):
-            screen.blit(UI_FONT.render(l, True, WHITE), (WIDTH//2 - 300//2, HEIGHT//3 + i*30))
+            screen.blit(render_text(UI_FONT, l, WHITE), (WIDTH//2 - 300//2, HEIGHT//3 + i*30))
         pygame.display.update()
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT: pygame.quit(); sys.exit()
             if ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
                 showing = False
+        clock.tick(30)
 
 def settings_menu():
     global sound_enabled
     waiting = True
     while waiting:
-        screen.blit(menu_background, (0,0))
+        screen.blit(assets.image("menu_background"), (0,0))
         blit_centered_text("SETTINGS", TITLE_FONT, YELLOW, HEIGHT//6)
-        sound_text = UI_FONT.render(f"Sound: {'ON' if sound_enabled else 'OFF'}  (press M to toggle)", True, WHITE)
-        back_text = UI_FONT.render("Press ESC to go back", True, WHITE)
+        sound_text = render_text(UI_FONT, f"Sound: {'ON' if sound_enabled else 'OFF'}  (press M to toggle)", WHITE)
+        back_text = render_text(UI_FONT, "Press ESC to go back", WHITE)
         screen.blit(sound_text, (WIDTH//2 - sound_text.get_width()//2, HEIGHT//2))
         screen.blit(back_text, (WIDTH//2 - back_text.get_width()//2, HEIGHT//2 + 40))
         pygame.display.update()
@@ -274,6 +225,7 @@ def settings_menu():
                 if ev.key == pygame.K_ESCAPE: waiting = False
                 if ev.key == pygame.K_m:
                     sound_enabled = not sound_enabled
+        clock.tick(30)
 
 def draw_hud(score, highscore, level):
     # semi-transparent black bar
@@ -282,237 +234,301 @@ def draw_hud(score, highscore, level):
     screen.blit(hud_bg, (0, 0))
 
     # render score, highscore, level
-    score_surf = SCORE_FONT.render(f"Score: {score}", True, (255, 215, 0))
-    hs_surf = SCORE_FONT.render(f"High Score: {highscore}", True, (255, 215, 0))
-    lvl_surf = SCORE_FONT.render(f"Level: {level}", True, (255, 215, 0))
+    score_surf = render_text(SCORE_FONT, f"Score: {score}", (255, 215, 0))
+    hs_surf = render_text(SCORE_FONT, f"High Score: {highscore}", (255, 215, 0))
+    lvl_surf = render_text(SCORE_FONT, f"Level: {level}", (255, 215, 0))
 
     screen.blit(score_surf, (10, 10))
     screen.blit(hs_surf, (10, 30))
     screen.blit(lvl_surf, (WIDTH - lvl_surf.get_width() - 10, 10))
 
 # ---------------- MAIN GAME LOOP ----------------
-def game_loop():
-    highscore = read_highscore()
+static_layer = StaticLayer()    # level background with the rocks drawn in (see static_layer.py)
+
+def level_backdrop(game, camera=None):
+    # what sits behind the snake; a big world scrolls, so there it is just the background
+    background = assets.background(game.level)
+    if camera is not None:
+        return background
+    return static_layer.get(game, background, assets.image("rock"))
+
+profiler = FrameProfiler()
+profiler_overlay = None     # created on first F3
+KEY_ACTIONS = {
+    pygame.K_UP: engine.UP,
+    pygame.K_RIGHT: engine.RIGHT,
+    pygame.K_DOWN: engine.DOWN,
+    pygame.K_LEFT: engine.LEFT,
+}
 
-    # local game state to avoid UnboundLocal issues
-    snake_speed = float(INITIAL_SPEED)
-    x = WIDTH//2; y = HEIGHT//2
-    dx = 0; dy = 0
+def interpolated_snake(game, alpha):
+    # pixel position of every segment, alpha (0..1) of the way from where it was on the last tick
+    B = SNAKE_BLOCK
+    cells = game.snake
+    if not game.moved:
+        return [(sx*B, sy*B) for sx, sy in cells]
     snake = []
-    snake_len = 1
-    score = 0
-    level = 1
-    level_thresholds = [100,200,300]
-    shield_strength = 0
-    slow_end = 0.0
-
-    # spawn initial item and obstacles (avoid starting near center)
-    item_type, fx, fy, item_img, item_size, item_pts, item_effect = spawn_fruit_or_power()
-    obstacles = spawn_obstacles(5, avoid_positions=[(WIDTH//2, HEIGHT//2)])
+    px, py = game.last_tail or cells[0]   # each segment moves into the cell of the one ahead of it
+    for sx, sy in cells:
+        snake.append((int((px + (sx-px)*alpha) * B), int((py + (sy-py)*alpha) * B)))
+        px, py = sx, sy
+    return snake
+
+def save_replay(recording):
+    # runs on the scores worker (like every other write), which reports a failed one
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    name = "%s-%d-%x.replay" % (time.strftime("%Y%m%d-%H%M%S"), recording.score, recording.seed)
+    recording.save(os.path.join(REPLAY_DIR, name))
+
+def game_loop(replay=None, pilot=None):
+    # replay: a Replay to play back instead of reading the arrow keys
+    # pilot: an Autopilot to steer instead (demo); any key ends it and returns True
+    highscore = read_highscore()
+    counts = replay is None and pilot is None     # only games played by hand are scored
+
+    # all rules live in the engine; this loop only handles input and drawing.
+    # The engine advances at game.tick_rate() ticks per second while frames are
+    # drawn at RENDER_FPS, with the snake interpolated between ticks.
+    # SNAKE_WORLD: a big world seen through a camera (hand-played games only)
+    camera = None
+    if WORLD_SIZE and counts:
+        game = WorldEngine(*WORLD_SIZE)
+        camera = Camera(game.grid_w, game.grid_h)
+    else:
+        game = engine.SnakeEngine(replay.seed if replay is not None else None)
+    # replays store no world size, so big-world games aren't recorded; neither are
+    # demo games, which would fill SNAKE_REPLAY_DIR while the attract loop idles
+    recording = Replay(game.seed) if replay is None and pilot is None and camera is None else None
+    particles.clear()
+    particles.rng.seed(game.seed)
+    # the camera moves the whole picture every frame: nothing to gain from dirty rects
+    dirty = DirtyRects() if DIRTY_RECTS and camera is None else None
+    drawn_layer = None
 
     paused = False
     game_close = False
-    faded = False
-    final_game_over_surf = None
+    turns = engine.InputQueue()
+    now = 0.0               # seconds since the game started (real time)
+    sim_time = 0.0          # real time not yet simulated
+    particle_time = 0.0
+    hold_until = 0.0        # level-up banner: simulation waits, input and drawing don't
+    over_at = None          # when the game ended (drives the GAME OVER fade)
+    fps = RENDER_FPS
 
-    head_dir = (0,0)
+    global profiler_overlay
+    prof = profiler
 
     while True:
+        prof.start()
+        # cap dt so a stall (window drag, breakpoint) doesn't fast-forward the game
+        dt = min(clock.tick(fps) / 1000.0, 0.25)
+        now += dt
+        prof.mark("idle")
+
         # event loop
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
             if ev.type == pygame.KEYDOWN:
-                if not game_close:
-                    # prevent 180-degree turns
-                    if ev.key == pygame.K_LEFT and dx == 0:
-                        dx, dy = -SNAKE_BLOCK, 0
-                        head_dir = (-1,0)
-                    elif ev.key == pygame.K_RIGHT and dx == 0:
-                        dx, dy = SNAKE_BLOCK, 0
-                        head_dir = (1,0)
-                    elif ev.key == pygame.K_UP and dy == 0:
-                        dx, dy = 0, -SNAKE_BLOCK
-                        head_dir = (0,-1)
-                    elif ev.key == pygame.K_DOWN and dy == 0:
-                        dx, dy = 0, SNAKE_BLOCK
-                        head_dir = (0,1)
+                if ev.key == pygame.K_F3:
+                    if profiler_overlay is None:
+                        profiler_overlay = ProfilerOverlay(prof, MONO_FONT, 1.0 / RENDER_FPS)
+                    else:
+                        profiler_overlay = None
+                    if dirty: dirty.invalidate()
+                elif ev.key == pygame.K_F4:
+                    prof.dump(PROFILE_FILE)
+                elif pilot is not None:
+                    return True
+                elif not game_close:
+                    # arrows pressed while paused are dropped, not applied on the first ticks after it
+                    if ev.key in KEY_ACTIONS and replay is None and not paused:
+                        turns.push(KEY_ACTIONS[ev.key], game)
                     elif ev.key == pygame.K_p:
                         paused = not paused
+                        if not paused and dirty: dirty.invalidate()
                 else:
                     if ev.key == pygame.K_c:
                         # restart: return to menu loop (menu will call game_loop again)
-                        if score > highscore:
-                            save_highscore(score)
+                        if game.score > highscore and counts:
+                            save_highscore(game.score)
                         return
                     if ev.key == pygame.K_q:
-                        if score > highscore:
-                            save_highscore(score)
+                        if game.score > highscore and counts:
+                            save_highscore(game.score)
                             pygame.mixer.music.stop()
                         pygame.quit(); sys.exit()
 
         # paused screen
-        while paused:
-            screen.blit(backgrounds.get(level, backgrounds[1]), (0,0))
+        if paused:
+            screen.blit(level_backdrop(game, camera), (0,0))
             blit_centered_text("PAUSED", BIG_FONT, YELLOW, HEIGHT//3)
             blit_centered_text("Press P to resume", UI_FONT, WHITE, HEIGHT//2)
             pygame.display.update()
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT: pygame.quit(); sys.exit()
-                if ev.type == pygame.KEYDOWN and ev.key == pygame.K_p:
-                    paused = False
+            fps = 10
+            continue
 
         # If game over (death), show Game Over screen (fade-in once) and wait for C/Q
         if game_close:
-            if not faded:
+            if pilot is not None and now - over_at >= DEMO_OVER_SECONDS:
+                return False
+            score, level = game.score, game.level
+            screen.blit(level_backdrop(game, camera), (0,0))
+            fade = (now - over_at) / FADE_SECONDS
+            if fade < 1:
                 # fade in GAME OVER once
-                for alpha in range(0,256,6):
-                    screen.blit(backgrounds.get(level, backgrounds[1]), (0,0))
-                    surf = BIG_FONT.render("GAME OVER", True, RED)
-                    surf.set_alpha(alpha)
-                    screen.blit(surf, (WIDTH//2 - surf.get_width()//2, HEIGHT//4))
-                    pygame.display.update()
-                    pygame.time.delay(8)
-                faded = True
-                final_game_over_surf = BIG_FONT.render("GAME OVER", True, RED)
-
-            screen.blit(backgrounds.get(level, backgrounds[1]), (0,0))
-            screen.blit(final_game_over_surf, (WIDTH//2 - final_game_over_surf.get_width()//2, HEIGHT//4))
-            fs = SCORE_FONT.render(f"Your Score: {score}", True, WHITE)
-            hs = SCORE_FONT.render(f"High Score: {max(score, highscore)}", True, WHITE)
-            screen.blit(fs, (WIDTH//2 - fs.get_width()//2, HEIGHT//2))
-            screen.blit(hs, (WIDTH//2 - hs.get_width()//2, HEIGHT//2 + 40))
-            screen.blit(UI_FONT.render("Press C to Play Again or Q to Quit", True, WHITE), (WIDTH//2 - 240//2, HEIGHT*3//4))
+                surf = render_text(BIG_FONT, "GAME OVER", RED).copy()
+                surf.set_alpha(int(255 * fade))
+                screen.blit(surf, (WIDTH//2 - surf.get_width()//2, HEIGHT//4))
+                fps = RENDER_FPS
+            else:
+                surf = render_text(BIG_FONT, "GAME OVER", RED)
+                screen.blit(surf, (WIDTH//2 - surf.get_width()//2, HEIGHT//4))
+                fs = render_text(SCORE_FONT, f"Your Score: {score}", WHITE)
+                hs = render_text(SCORE_FONT, f"High Score: {max(score, highscore)}", WHITE)
+                screen.blit(fs, (WIDTH//2 - fs.get_width()//2, HEIGHT//2))
+                screen.blit(hs, (WIDTH//2 - hs.get_width()//2, HEIGHT//2 + 40))
+                screen.blit(render_text(UI_FONT, "Press C to Play Again or Q to Quit", WHITE), (WIDTH//2 - 240//2, HEIGHT*3//4))
+                fps = 10
             pygame.display.update()
-            # small event handling loop (top-level will handle actual keys)
-            for ev in pygame.event.get():
-                if ev.type == pygame.QUIT: pygame.quit(); sys.exit()
-            clock.tick(10)
             continue
 
-        # NORMAL gameplay update
-        x += dx; y += dy
-
-        # boundary collision
-        if x < 0 or x >= WIDTH or y < 0 or y >= HEIGHT:
-            if shield_strength > 0:
-                shield_strength = 0
-                # clamp inside and reset movement
-                x = max(0, min(WIDTH - SNAKE_BLOCK, x))
-                y = max(0, min(HEIGHT - SNAKE_BLOCK, y))
-                dx, dy = 0, 0
+        # NORMAL gameplay update: run every tick that is due
+        prof.mark("events")
+        fps = RENDER_FPS
+        if now >= hold_until:
+            sim_time += dt
+        tick_len = 1.0 / game.tick_rate()
+        while sim_time >= tick_len:
+            sim_time -= tick_len
+            if replay is not None:
+                action = replay.action(game.ticks)
+            elif pilot is not None:
+                action = pilot.action(game)
             else:
+                action = turns.pop()
+            if recording is not None: recording.record(action)
+            events = game.step(action)
+            if engine.CRASH in events:
                 if sound_enabled: crash_sound.play()
                 game_close = True
-                if score > highscore:
-                    highscore = score
+                over_at = now
+                if recording is not None:
+                    recording.finish(game)
+                    if REPLAY_DIR: scores.submit(lambda: save_replay(recording))
+                if counts:
+                    # duration: simulated seconds, so pauses and level-up holds don't count
+                    scores.record_run(game.score, game.level, len(game.snake), game.time, game.ticks, game.seed)
+                if game.score > highscore and counts:
+                    highscore = game.score
                     save_highscore(highscore)
-                continue
+                if PROFILE_DUMP: prof.dump(PROFILE_DUMP)
+                break
 
-        # draw background for level
-        screen.blit(backgrounds.get(level, backgrounds[1]), (0,0))
-
-        # obstacles
-        for ox, oy in obstacles:
-            screen.blit(rock_img, (ox, oy))
-            if abs(x - ox) < SNAKE_BLOCK and abs(y - oy) < SNAKE_BLOCK:
-                if shield_strength > 0:
-                    shield_strength = 0
-                    try: obstacles.remove((ox,oy))
-                    except: pass
-                else:
-                    if sound_enabled: crash_sound.play()
-                    game_close = True
-                    if score > highscore:
-                        highscore = score
-                        save_highscore(highscore)
-                    break
+            # EATING / PICKUPS: spawn particles & sound
+            if engine.EAT in events:
+                spawn_particles(game.x * SNAKE_BLOCK, game.y * SNAKE_BLOCK, color=(255,215,0))
+                if sound_enabled: chomp_sound.play()
+
+            if engine.LEVEL_UP in events:
+                if sound_enabled: levelup_sound.play()
+                # show small level up message and hold the game for a moment
+                hold_until = now + LEVEL_UP_SECONDS
+                sim_time = 0.0
+                break
+            tick_len = 1.0 / game.tick_rate()
 
         if game_close:
             continue
+        prof.mark("update")
 
-        # draw current item (fruit or power)
-        screen.blit(pygame.transform.scale(item_img, (item_size, item_size)), (fx, fy))
-
-        # snake mechanics
-        head = (x,y)
-        snake.append(head)
-        if len(snake) > snake_len:
-            del snake[0]
-
-        # self collision
-        hit_self = False
-        for seg in snake[:-1]:
-            if seg == head:
-                hit_self = True
-                break
-        if hit_self:
-            if shield_strength > 0:
-                shield_strength = 0
+        # draw background for level
+        background = assets.background(game.level)
+        rock_img = assets.image("rock")
+        alpha = sim_time / tick_len
+        view_x = view_y = 0
+        if camera is not None:
+            # big world: the background stays put, only rocks in view are drawn
+            snake = interpolated_snake(game, alpha)
+            view_x, view_y = camera.follow(*snake[-1])
+            screen.blit(background, (0,0))
+            for ox, oy in game.rocks_in(*camera.cells()):
+                screen.blit(rock_img, (ox * SNAKE_BLOCK - view_x, oy * SNAKE_BLOCK - view_y))
+        else:
+            # background and obstacles: one blit of the cached layer
+            layer = static_layer.get(game, background, rock_img)
+            if dirty is None:
+                screen.blit(layer, (0,0))
             else:
-                if sound_enabled: crash_sound.play()
-                game_close = True
-                if score > highscore:
-                    highscore = score
-                    save_highscore(highscore)
-                continue
+                # only repaint what moved, unless the layer was rebuilt (rocks or level changed)
+                if layer is not drawn_layer:
+                    drawn_layer = layer
+                    dirty.invalidate()
+                dirty.restore(screen, layer)
+        drawn = []
+
+        # draw current item (fruit or power); None once the board is full
+        if game.item is not None:
+            kind, fx, fy, item_size, _ = game.item
+            drawn.append(screen.blit(scaled(assets.image(kind), (item_size, item_size)),
+                                     (fx * SNAKE_BLOCK - view_x, fy * SNAKE_BLOCK - view_y)))
+        prof.mark("obstacles")
 
         # draw snake (provide head_dir for eye orientation)
-        draw_snake(snake, head_dir=head_dir, shield_strength=shield_strength)
+        if camera is None:
+            snake = interpolated_snake(game, alpha)
+            drawn += draw_snake(snake, head_dir=game.head_dir, shield_strength=game.shield)
+        else:
+            drawn += draw_snake(snake, head_dir=game.head_dir, shield_strength=game.shield,
+                                offset=(view_x, view_y))
+        prof.mark("draw_snake")
 
         # draw UI
-        score_surf = SCORE_FONT.render(f"Score: {score}", True, YELLOW)
-        screen.blit(score_surf, (10,10))
-        hs_surf = SCORE_FONT.render(f"High Score: {highscore}", True, YELLOW)
-        screen.blit(hs_surf, (10,40))
-        lvl_surf = SCORE_FONT.render(f"Level: {level}", True, YELLOW)
-        screen.blit(lvl_surf, (WIDTH - lvl_surf.get_width() - 10, 10))
-
-        # update and draw particles
-        update_particles()
-
-        pygame.display.update()
-
-        # EATING / PICKUPS (we used exact-grid spawning, so equality is OK)
-        if x == fx and y == fy:
-            # powerups or fruit
-            if item_effect == "shield":
-                shield_strength = 1
-            elif item_effect == "slow":
-                slow_end = time.time() + 5.0
-            else:
-                snake_len += 1
-                score += item_pts
-                snake_speed += (item_pts / 40.0)
-            # spawn particles & sound
-            spawn_particles(x, y, color=(255,215,0))
-            if sound_enabled: chomp_sound.play()
-            # spawn next and maybe add obstacle
-            item_type, fx, fy, item_img, item_size, item_pts, item_effect = spawn_fruit_or_power()
-            if random.randint(1,3) == 1:
-                obstacles.extend(spawn_obstacles(1, avoid_positions=[(x,y),(fx,fy)]))
-
-        # level up at 100,200,300...
-        if level <= len(level_thresholds) and score >= level_thresholds[level-1]:
-            level += 1
-            obstacles.extend(spawn_obstacles(2))
-            if sound_enabled: levelup_sound.play()
-            # show small level up message
-            lvmsg = SCORE_FONT.render(f"Level {level}!", True, (255,215,0))
-            screen.blit(lvmsg, (WIDTH//2 - lvmsg.get_width()//2, HEIGHT//2 - 40))
+        score_surf = render_text(SCORE_FONT, f"Score: {game.score}", YELLOW)
+        drawn.append(screen.blit(score_surf, (10,10)))
+        hs_surf = render_text(SCORE_FONT, f"High Score: {highscore}", YELLOW)
+        drawn.append(screen.blit(hs_surf, (10,40)))
+        lvl_surf = render_text(SCORE_FONT, f"Level: {game.level}", YELLOW)
+        drawn.append(screen.blit(lvl_surf, (WIDTH - lvl_surf.get_width() - 10, 10)))
+        if pilot is not None:
+            demo_surf = render_text(UI_FONT, "DEMO - press any key", WHITE)
+            drawn.append(screen.blit(demo_surf, (WIDTH//2 - demo_surf.get_width()//2, HEIGHT - 40)))
+        if now < hold_until:
+            lvmsg = render_text(SCORE_FONT, f"Level {game.level}!", (255,215,0))
+            drawn.append(screen.blit(lvmsg, (WIDTH//2 - lvmsg.get_width()//2, HEIGHT//2 - 40)))
+        prof.mark("hud")
+
+        # update and draw particles (they age at PARTICLE_RATE, whatever the frame rate)
+        particle_time += dt
+        steps = int(particle_time * PARTICLE_RATE)
+        particle_time -= steps / PARTICLE_RATE
+        drawn += update_particles(steps, (view_x, view_y))
+        prof.mark("particles")
+
+        if profiler_overlay is not None:
+            panel = profiler_overlay.render(now)
+            drawn.append(screen.blit(panel, (10, HEIGHT - panel.get_height() - 10)))
+            prof.mark("hud")
+
+        if dirty is None:
             pygame.display.update()
-            pygame.time.delay(700)
-
-        # FPS calculation (account for slow powerup)
-        fps = max(FPS_MIN, int(round(snake_speed)))
-        if slow_end > time.time():
-            fps = max(5, int(round(snake_speed / 2.0)))
-        clock.tick(fps)
+        else:
+            dirty.extend(drawn)
+            dirty.flip()
+        prof.mark("display")
+        prof.commit()
 
 # ---------------- RUN ----------------
 if __name__ == "__main__":
-    pygame.mixer.music.load(os.path.join(BASE_DIR, "background_music.mp3"))
-pygame.mixer.music.play(-1)  # -1 means loop forever
-while True:
+    init_display()
+    if sys.argv[1:2] == ["--replay"]:
+        # watch a recorded game, then exit
+        game_loop(Replay.load(sys.argv[2]))
+        sys.exit()
+    if sys.argv[1:2] == ["--demo"]:
+        # unattended autopilot games (attract screen / soak test) until a key is pressed
+        demo()
+        sys.exit()
+    while True:
         main_menu()
         game_loop()
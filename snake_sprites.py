@@ -0,0 +1,88 @@
+# snake_sprites.py — pre-rendered snake pieces for draw_snake
+#
+# The body gradient is quantized to GRADIENT_STEPS colors, each drawn once
+# into a sprite; heads are drawn once per (direction, color step); the wave
+# offset comes from a sine table. A frame of snake is then a single blits()
+# call instead of one draw.circle (and a sin) per segment.
+
+import math
+import pygame
+from engine import SNAKE_BLOCK
+
+WHITE = (255,255,255)
+BLACK = (0,0,0)
+TONGUE = (220,30,30)
+
+GRADIENT_STEPS = 32
+WAVE_STEPS = 256
+WAVE_AMPLITUDE = 3
+# int(3 * sin(phase)) for WAVE_STEPS phases around the circle
+WAVE = [int(WAVE_AMPLITUDE * math.sin(i * 2*math.pi / WAVE_STEPS)) for i in range(WAVE_STEPS)]
+WAVE_SCALE = WAVE_STEPS / (2*math.pi)
+WAVE_REACH = max(abs(w) for w in WAVE)     # furthest the wave moves a segment sideways, in px
+
+HEAD_SIZE = SNAKE_BLOCK * 3     # head sprites cover the 3x3 block around the head cell
+
+def gradient_color(step):
+    # bright green at head, darker green tail (step 0 = brightest)
+    ratio = step / (GRADIENT_STEPS - 1)
+    return (int(30 + ratio*50), int(200 - ratio*120), int(30 + ratio*20))
+
+def make_body(color):
+    r = SNAKE_BLOCK//2
+    surf = pygame.Surface((SNAKE_BLOCK, SNAKE_BLOCK), pygame.SRCALPHA)
+    pygame.draw.circle(surf, color, (r, r), r)
+    return surf
+
+def make_head(color, head_dir):
+    # HEAD (bigger, with eyes & tongue), centered in a HEAD_SIZE square
+    surf = pygame.Surface((HEAD_SIZE, HEAD_SIZE), pygame.SRCALPHA)
+    cx = cy = HEAD_SIZE//2
+    pygame.draw.circle(surf, color, (cx, cy), SNAKE_BLOCK//2 + 2)
+
+    # Eyes based on head_dir
+    eye_offset = 6
+    if head_dir[0] != 0:   # moving horizontally
+        eye_y = cy - 4
+        pygame.draw.circle(surf, WHITE, (cx - eye_offset, eye_y), 3)
+        pygame.draw.circle(surf, WHITE, (cx + eye_offset, eye_y), 3)
+        pygame.draw.circle(surf, BLACK, (cx - eye_offset, eye_y), 1)
+        pygame.draw.circle(surf, BLACK, (cx + eye_offset, eye_y), 1)
+    else:   # moving vertically
+        eye_x = cx - 4
+        pygame.draw.circle(surf, WHITE, (eye_x, cy - eye_offset), 3)
+        pygame.draw.circle(surf, WHITE, (eye_x+8, cy - eye_offset), 3)
+        pygame.draw.circle(surf, BLACK, (eye_x, cy - eye_offset), 1)
+        pygame.draw.circle(surf, BLACK, (eye_x+8, cy - eye_offset), 1)
+
+    # Tongue (red fork)
+    if head_dir != (0,0):
+        tongue_len = 12
+        tx, ty = cx + head_dir[0]*tongue_len, cy + head_dir[1]*tongue_len
+        pygame.draw.line(surf, TONGUE, (cx, cy), (tx, ty), 2)
+        # fork
+        if head_dir[0] != 0:  # left/right fork
+            pygame.draw.line(surf, TONGUE, (tx, ty), (tx, ty-4), 2)
+            pygame.draw.line(surf, TONGUE, (tx, ty), (tx, ty+4), 2)
+        else:  # up/down fork
+            pygame.draw.line(surf, TONGUE, (tx, ty), (tx-4, ty), 2)
+            pygame.draw.line(surf, TONGUE, (tx, ty), (tx+4, ty), 2)
+    return surf
+
+def make_bubble():
+    bubble = pygame.Surface((HEAD_SIZE, HEAD_SIZE), pygame.SRCALPHA)
+    pygame.draw.circle(bubble, (0,200,255,90), (HEAD_SIZE//2, HEAD_SIZE//2), SNAKE_BLOCK+8)
+    return bubble
+
+class SnakeAtlas:
+    def __init__(self):
+        self.body = [make_body(gradient_color(i)) for i in range(GRADIENT_STEPS)]
+        self.heads = {}     # (head_dir, step) -> Surface, filled on first use
+        self.bubble = make_bubble()
+
+    def head(self, head_dir, step):
+        key = (head_dir, step)
+        surf = self.heads.get(key)
+        if surf is None:
+            surf = self.heads[key] = make_head(gradient_color(step), head_dir)
+        return surf
@@ -0,0 +1,28 @@
+# static_layer.py — the level background with every rock already drawn on it
+#
+# Rocks only change when one spawns or a shield smashes one, so rather than
+# blitting the background and then each rock every frame, both are composited
+# once into a screen-sized surface and a frame starts with a single blit. The
+# layer is rebuilt when the game, its level or its rock_version changes.
+
+import pygame
+from engine import SNAKE_BLOCK
+
+class StaticLayer:
+    def __init__(self):
+        self.surface = None
+        self.key = None
+
+    def get(self, game, background, rock_img):
+        # the layer for game's current level and rocks; a new Surface whenever it was rebuilt
+        key = (game.seed, game.level, game.rock_version, id(background), id(rock_img))
+        if key != self.key:
+            # opaque and in the display's format, so the per-frame blit is a plain copy
+            surf = pygame.Surface(background.get_size())
+            if pygame.display.get_surface():
+                surf = surf.convert()
+            surf.blit(background, (0,0))
+            surf.blits([(rock_img, (ox * SNAKE_BLOCK, oy * SNAKE_BLOCK)) for ox, oy in game.obstacles],
+                       doreturn=False)
+            self.surface, self.key = surf, key
+        return self.surface
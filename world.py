@@ -0,0 +1,223 @@
+# world.py — big scrolling worlds: chunked tiles, lazily generated rocks and a camera
+#
+# WorldEngine plays by SnakeEngine's rules on a board of any size (10000x10000
+# cells is fine). Nothing is stored per cell of the world: the body and the
+# rocks live in CHUNK x CHUNK tiles that only exist where something is, rocks
+# are scattered per chunk from the seed the first time that chunk is looked at,
+# and items and new rocks spawn around the head. The Camera keeps the head on
+# screen, and snake.py only draws the chunks it can see, so memory and frame
+# time depend on the view and the snake, not on the world.
+#
+#     SNAKE_WORLD=10000x10000 python snake.py
+
+import random
+from collections import OrderedDict
+from engine import SnakeEngine, NOOP, WIDTH, HEIGHT, SNAKE_BLOCK
+
+CHUNK_SHIFT = 5
+CHUNK = 1 << CHUNK_SHIFT    # cells per chunk side
+CHUNK_MASK = CHUNK - 1
+ROCK_DENSITY = 0.01         # share of cells with a rock
+MAX_ROCK_CHUNKS = 4096      # generated chunks kept around (~1 KB each); untouched ones get regenerated
+SPAWN_RADIUS = 12           # items and new rocks appear within this many cells of the head
+SPAWN_TRIES = 64
+
+# ---------------- CHUNKED TILES ----------------
+class ChunkGrid:
+    # Sparse byte grid indexed like engine.py's flat arrays (x + y*w). A chunk is
+    # allocated on its first non-zero cell and freed once it is all zeros again.
+
+    def __init__(self, w):
+        self.w = w
+        self.chunks = {}    # (cx, cy) -> bytearray(CHUNK*CHUNK)
+        self.used = {}      # (cx, cy) -> non-zero cells in it
+
+    def __getitem__(self, c):
+        y, x = divmod(c, self.w)
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        return chunk[(x & CHUNK_MASK) | (y & CHUNK_MASK) << CHUNK_SHIFT] if chunk is not None else 0
+
+    def __setitem__(self, c, v):
+        y, x = divmod(c, self.w)
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if not v:
+                return
+            chunk = self.chunks[key] = bytearray(CHUNK * CHUNK)
+            self.used[key] = 0
+        i = (x & CHUNK_MASK) | (y & CHUNK_MASK) << CHUNK_SHIFT
+        was = chunk[i]
+        chunk[i] = v
+        if bool(was) != bool(v):
+            n = self.used[key] = self.used[key] + (1 if v else -1)
+            if not n:
+                del self.chunks[key], self.used[key]
+
+class RockField:
+    # Rocks of a big world, indexed like ChunkGrid. A chunk's rocks are generated
+    # from (seed, chunk) the first time it is read, so they are the same every
+    # time; chunks the game changed (rock spawned or smashed) are kept for good,
+    # the rest are dropped least recently used first and regenerated on demand.
+
+    def __init__(self, w, h, seed, density=ROCK_DENSITY, clear=None, max_chunks=MAX_ROCK_CHUNKS):
+        self.w, self.h = w, h
+        self.seed = seed
+        self.per_chunk = round(CHUNK * CHUNK * density)
+        self.clear = clear          # (x, y): no generated rocks within 2 cells of it
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict() # (cx, cy) -> (bytearray grid, [(x, y), ...])
+        self.changed = set()
+
+    def chunk(self, key):
+        ch = self.chunks.get(key)
+        if ch is None:
+            ch = self.chunks[key] = self.generate(*key)
+            if len(self.chunks) > self.max_chunks:
+                old = next((k for k in self.chunks if k not in self.changed), None)
+                if old is not None:
+                    del self.chunks[old]
+        else:
+            self.chunks.move_to_end(key)
+        return ch
+
+    def generate(self, cx, cy):
+        grid = bytearray(CHUNK * CHUNK)
+        rocks = []
+        rng = random.Random("%d:%d:%d" % (self.seed, cx, cy))
+        for _ in range(self.per_chunk):
+            lx, ly = rng.randrange(CHUNK), rng.randrange(CHUNK)
+            x, y = cx*CHUNK + lx, cy*CHUNK + ly
+            i = lx | ly << CHUNK_SHIFT
+            # rocks are drawn 30x30 from their cell: keep them off the last column/row
+            if x >= self.w - 1 or y >= self.h - 1 or grid[i]:
+                continue
+            if self.clear and abs(x - self.clear[0]) <= 2 and abs(y - self.clear[1]) <= 2:
+                continue
+            grid[i] = 1
+            rocks.append((x, y))
+        return grid, rocks
+
+    def __getitem__(self, c):
+        y, x = divmod(c, self.w)
+        grid = self.chunk((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))[0]
+        return grid[(x & CHUNK_MASK) | (y & CHUNK_MASK) << CHUNK_SHIFT]
+
+    def __setitem__(self, c, v):
+        y, x = divmod(c, self.w)
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        grid, rocks = self.chunk(key)
+        i = (x & CHUNK_MASK) | (y & CHUNK_MASK) << CHUNK_SHIFT
+        if bool(grid[i]) == bool(v):
+            return
+        grid[i] = 1 if v else 0
+        if v:
+            rocks.append((x, y))
+        else:
+            rocks.remove((x, y))
+        self.changed.add(key)
+
+    def in_rect(self, x0, y0, x1, y1):
+        # rocks with x0 <= x < x1 and y0 <= y < y1
+        out = []
+        for cy in range(max(0, y0) >> CHUNK_SHIFT, ((min(y1, self.h) - 1) >> CHUNK_SHIFT) + 1):
+            for cx in range(max(0, x0) >> CHUNK_SHIFT, ((min(x1, self.w) - 1) >> CHUNK_SHIFT) + 1):
+                out.extend((x, y) for x, y in self.chunk((cx, cy))[1] if x0 <= x < x1 and y0 <= y < y1)
+        return out
+
+# ---------------- ENGINE ----------------
+class WorldEngine(SnakeEngine):
+    # SnakeEngine on a grid_w x grid_h world with sparse storage; same rules, same events
+
+    def __init__(self, grid_w, grid_h, seed=None, rock_density=ROCK_DENSITY):
+        self.grid_w, self.grid_h = grid_w, grid_h
+        self.rock_density = rock_density
+        super().__init__(seed)
+
+    def new_board(self):
+        self.occupied = ChunkGrid(self.grid_w)
+        self.rocks = RockField(self.grid_w, self.grid_h, self.seed, self.rock_density, clear=(self.x, self.y))
+        self.obstacles = ()     # there is no full list: see rocks_in()
+        self.item = None
+
+    def rocks_in(self, x0, y0, x1, y1):
+        return self.rocks.in_rect(x0, y0, x1, y1)
+
+    # no free-cell sets to keep up to date: spawns sample around the head instead
+    def _block(self, c):
+        pass
+
+    def _unblock(self, c):
+        pass
+
+    def step(self, action=NOOP):
+        # nowhere to put the last item (head boxed in): try again as the snake moves on
+        if self.item is None and not self.done:
+            self.item = self.spawn_fruit_or_power()
+        return super().step(action)
+
+    def random_cell(self, avoid=()):
+        # a free cell near the head, never within one cell of avoid; None if none turned up
+        rng, w = self.rng, self.grid_w
+        item = None if self.item is None else self.item[1] + self.item[2]*w
+        x0, x1 = max(0, self.x - SPAWN_RADIUS), min(w - 2, self.x + SPAWN_RADIUS)
+        y0, y1 = max(0, self.y - SPAWN_RADIUS), min(self.grid_h - 2, self.y + SPAWN_RADIUS)
+        for _ in range(SPAWN_TRIES):
+            x, y = rng.randint(x0, x1), rng.randint(y0, y1)
+            c = x + y*w
+            if c == item or self.occupied[c] or self.rocks[c]:
+                continue
+            if any(abs(x - ax) <= 1 and abs(y - ay) <= 1 for ax, ay in avoid):
+                continue
+            return c
+        return None
+
+    def spawn_fruit_or_power(self):
+        kind, size, pts = self.pick_item()
+        c = self.random_cell()
+        if c is None:
+            return None
+        return (kind, c % self.grid_w, c // self.grid_w, size, pts)
+
+    def spawn_obstacles(self, n, avoid_positions=None):
+        obs = []
+        for _ in range(n):
+            c = self.random_cell(avoid_positions or ())
+            if c is None:
+                break
+            self.rocks[c] = 1
+            obs.append((c % self.grid_w, c // self.grid_w))
+        if obs:
+            self.rock_version += 1
+        return obs
+
+    def remove_obstacle(self, x, y):
+        c = x + y*self.grid_w
+        if self.rocks[c]:
+            self.rocks[c] = 0
+            self.rock_version += 1
+
+# ---------------- CAMERA ----------------
+class Camera:
+    # top-left corner of the view in world pixels; follows a point, stops at the world's edges
+
+    def __init__(self, grid_w, grid_h, view_w=WIDTH, view_h=HEIGHT):
+        self.grid_w, self.grid_h = grid_w, grid_h
+        self.view_w, self.view_h = view_w, view_h
+        self.max_x = max(0, grid_w*SNAKE_BLOCK - view_w)
+        self.max_y = max(0, grid_h*SNAKE_BLOCK - view_h)
+        self.x = self.y = 0
+
+    def follow(self, px, py):
+        # center on pixel (px, py) (a cell's top-left); returns the new offset
+        self.x = min(max(0, int(px) + SNAKE_BLOCK//2 - self.view_w//2), self.max_x)
+        self.y = min(max(0, int(py) + SNAKE_BLOCK//2 - self.view_h//2), self.max_y)
+        return self.x, self.y
+
+    def cells(self, margin=2):
+        # (x0, y0, x1, y1) cell range worth drawing; the margin catches sprites
+        # that hang into the view from a cell just outside it
+        B = SNAKE_BLOCK
+        return (max(0, self.x//B - margin), max(0, self.y//B - margin),
+                min(self.grid_w, (self.x + self.view_w)//B + margin + 1),
+                min(self.grid_h, (self.y + self.view_h)//B + margin + 1))